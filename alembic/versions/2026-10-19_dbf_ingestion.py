@@ -0,0 +1,131 @@
+"""dbf_ingestion
+
+Revision ID: 3f1c2a9d7b10
+Revises:
+Create Date: 2026-10-19 00:05:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f1c2a9d7b10"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dbf_ingestion",
+        sa.Column("id", sa.Integer(), sa.Identity(always=False), nullable=False),
+        sa.Column("table_name", sa.String(), nullable=False),
+        sa.Column("source_path", sa.String(), nullable=False),
+        sa.Column("checksum", sa.String(), nullable=False),
+        sa.Column("rows", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "started_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("dbf_ingestion_pkey")),
+        sa.UniqueConstraint(
+            "table_name", "source_path", name=op.f("dbf_ingestion_table_name_key")
+        ),
+    )
+    op.create_table(
+        "tformdet",
+        sa.Column("id", sa.Integer(), sa.Identity(always=False), nullable=False),
+        sa.Column("ingestion_id", sa.Integer(), nullable=False),
+        sa.Column("codigo_eje", sa.Text(), nullable=True),
+        sa.Column("codigo_pre", sa.Text(), nullable=True),
+        sa.Column("tipsum", sa.Text(), nullable=True),
+        sa.Column("annomes", sa.Integer(), nullable=True),
+        sa.Column("codigo_med", sa.Text(), nullable=True),
+        sa.Column("precio", sa.Float(), nullable=True),
+        sa.Column("ingre", sa.Float(), nullable=True),
+        sa.Column("venta", sa.Float(), nullable=True),
+        sa.Column("sis", sa.Float(), nullable=True),
+        sa.Column("intersan", sa.Float(), nullable=True),
+        sa.Column("stock_fin", sa.Float(), nullable=True),
+        sa.Column("fec_exp", sa.Date(), nullable=True),
+        sa.Column("medlote", sa.Text(), nullable=True),
+        sa.Column("medregsan", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["ingestion_id"],
+            ["dbf_ingestion.id"],
+            name=op.f("tformdet_ingestion_id_fkey"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("tformdet_pkey")),
+    )
+    op.create_index(
+        op.f("tformdet_ingestion_id_idx"), "tformdet", ["ingestion_id"], unique=False
+    )
+    op.create_index(op.f("tformdet_annomes_idx"), "tformdet", ["annomes"], unique=False)
+    op.create_index(
+        op.f("tformdet_codigo_med_idx"), "tformdet", ["codigo_med"], unique=False
+    )
+    op.create_table(
+        "mstockalm",
+        sa.Column("id", sa.Integer(), sa.Identity(always=False), nullable=False),
+        sa.Column("ingestion_id", sa.Integer(), nullable=False),
+        sa.Column("almcod", sa.Text(), nullable=True),
+        sa.Column("medcod", sa.Text(), nullable=True),
+        sa.Column("stksaldo", sa.Float(), nullable=True),
+        sa.Column("stkprecio", sa.Float(), nullable=True),
+        sa.Column("stkfechult", sa.DateTime(), nullable=True),
+        sa.Column("flg_socket", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["ingestion_id"],
+            ["dbf_ingestion.id"],
+            name=op.f("mstockalm_ingestion_id_fkey"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("mstockalm_pkey")),
+    )
+    op.create_index(
+        op.f("mstockalm_ingestion_id_idx"), "mstockalm", ["ingestion_id"], unique=False
+    )
+    op.create_index(op.f("mstockalm_medcod_idx"), "mstockalm", ["medcod"], unique=False)
+    op.create_table(
+        "mproducto",
+        sa.Column("id", sa.Integer(), sa.Identity(always=False), nullable=False),
+        sa.Column("ingestion_id", sa.Integer(), nullable=False),
+        sa.Column("medcod", sa.Text(), nullable=True),
+        sa.Column("mednom", sa.Text(), nullable=True),
+        sa.Column("medpres", sa.Text(), nullable=True),
+        sa.Column("medcnc", sa.Text(), nullable=True),
+        sa.Column("medtip", sa.Text(), nullable=True),
+        sa.Column("medpet", sa.Text(), nullable=True),
+        sa.Column("medff", sa.Text(), nullable=True),
+        sa.Column("medest", sa.Text(), nullable=True),
+        sa.Column("medregsan", sa.Text(), nullable=True),
+        sa.Column("estado", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["ingestion_id"],
+            ["dbf_ingestion.id"],
+            name=op.f("mproducto_ingestion_id_fkey"),
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", name=op.f("mproducto_pkey")),
+    )
+    op.create_index(
+        op.f("mproducto_ingestion_id_idx"), "mproducto", ["ingestion_id"], unique=False
+    )
+    op.create_index(op.f("mproducto_medcod_idx"), "mproducto", ["medcod"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("mproducto_medcod_idx"), table_name="mproducto")
+    op.drop_index(op.f("mproducto_ingestion_id_idx"), table_name="mproducto")
+    op.drop_table("mproducto")
+    op.drop_index(op.f("mstockalm_medcod_idx"), table_name="mstockalm")
+    op.drop_index(op.f("mstockalm_ingestion_id_idx"), table_name="mstockalm")
+    op.drop_table("mstockalm")
+    op.drop_index(op.f("tformdet_codigo_med_idx"), table_name="tformdet")
+    op.drop_index(op.f("tformdet_annomes_idx"), table_name="tformdet")
+    op.drop_index(op.f("tformdet_ingestion_id_idx"), table_name="tformdet")
+    op.drop_table("tformdet")
+    op.drop_table("dbf_ingestion")
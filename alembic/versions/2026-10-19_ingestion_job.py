@@ -0,0 +1,55 @@
+"""ingestion_job
+
+Revision ID: 8d4e6b21c5a3
+Revises: 3f1c2a9d7b10
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8d4e6b21c5a3"
+down_revision = "3f1c2a9d7b10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ingestion_job",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("tables", sa.JSON(), nullable=False),
+        sa.Column("progress", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column(
+            "started_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column(
+            "heartbeat_at",
+            sa.DateTime(),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id", name=op.f("ingestion_job_pkey")),
+    )
+    op.create_index(
+        "ingestion_job_running_key",
+        "ingestion_job",
+        ["status"],
+        unique=True,
+        postgresql_where=sa.text("status = 'running'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ingestion_job_running_key",
+        table_name="ingestion_job",
+        postgresql_where=sa.text("status = 'running'"),
+    )
+    op.drop_table("ingestion_job")
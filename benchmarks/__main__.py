@@ -0,0 +1,205 @@
+"""Punto de entrada de los benchmarks.
+
+python -m benchmarks generate --out /tmp/bench-data --products 5000
+python -m benchmarks run --products 5000 --months 36 --warehouses 8
+python -m benchmarks load --data-dir /tmp/bench-data --requests 200 --concurrency 16
+python -m benchmarks imports --module src.main --repeats 5
+python -m benchmarks compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Any
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _meta() -> dict[str, Any]:
+    import numpy as np
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _save(
+    kind: str, results: dict[str, Any], output: Path | None, **extra: Any
+) -> Path:
+    if output is None:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{kind}-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    payload = {"kind": kind, "meta": _meta(), **extra, "results": results}
+    output.write_text(json.dumps(payload, indent=2))
+    return output
+
+
+def _scale(args: argparse.Namespace):
+    from benchmarks.synthetic import Scale
+
+    return Scale(args.products, args.months, args.warehouses, args.start_annomes)
+
+
+def cmd_generate(args: argparse.Namespace) -> None:
+    from benchmarks.synthetic import generate_datasets, write_datasets
+
+    write_datasets(generate_datasets(_scale(args), args.seed), args.out)
+    print(f"Datasets sintéticos escritos en {args.out}")
+
+
+def cmd_run(args: argparse.Namespace) -> None:
+    from benchmarks.stages import bench_dbf, bench_summary
+    from benchmarks.synthetic import generate_datasets, write_datasets
+
+    scale = _scale(args)
+    frames = generate_datasets(scale, args.seed)
+    results: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="bench-data-") as tmp:
+        data_dir = Path(tmp)
+        write_datasets(frames, data_dir)
+        results["summary"] = bench_summary(data_dir, scale, args.repeats)
+        results["summary_real_time"] = bench_summary(
+            data_dir, scale, args.repeats, real_time=True
+        )
+    if not args.skip_dbf:
+        results["dbf_to_csv"] = bench_dbf(frames, args.repeats)
+
+    path = _save("stages", results, args.output, scale=scale.as_dict(), seed=args.seed)
+    for name, stats in results["summary"]["stages"].items():
+        print(
+            f"{name:<10} median {stats['median_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms"
+        )
+    print(f"Resultados guardados en {path}")
+
+
+def cmd_load(args: argparse.Namespace) -> None:
+    if args.data_dir:
+        # Debe fijarse antes de importar la app, que lee DATA_DIR de la configuración.
+        os.environ["DATA_DIR"] = str(args.data_dir)
+    from benchmarks.load import run_load_test
+
+    params = {"start_date": args.start_date, "end_date": args.end_date}
+    results = asyncio.run(
+        run_load_test(
+            args.path, params, args.requests, args.concurrency, base_url=args.url
+        )
+    )
+    path = _save("load", results, args.output)
+    latency = results["latency_ms"]
+    print(
+        f"{results['throughput_rps']:.1f} req/s  p50 {latency['p50']:.1f} ms  "
+        f"p95 {latency['p95']:.1f} ms  p99 {latency['p99']:.1f} ms  status {results['statuses']}"
+    )
+    print(f"Resultados guardados en {path}")
+
+
+def cmd_imports(args: argparse.Namespace) -> None:
+    from benchmarks.imports import bench_imports
+
+    results = bench_imports(args.module, args.repeats, args.depth)
+    path = _save("imports", results, args.output)
+    print(f"{'total':<40} {results['total']['median_ms']:>9.1f} ms")
+    for name, stats in list(results["modules"].items())[: args.top]:
+        print(
+            f"{name:<40} {stats['median_ms']:>9.1f} ms  (propio {stats['self_ms']:.1f} ms)"
+        )
+    print(f"Resultados guardados en {path}")
+
+
+def cmd_compare(args: argparse.Namespace) -> None:
+    from benchmarks.compare import compare_results, format_rows
+
+    print(format_rows(compare_results(args.baseline, args.candidate)))
+
+
+def _add_scale_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--warehouses", type=int, default=4)
+    parser.add_argument("--start-annomes", type=int, default=202101)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    subparsers = parser.add_subparsers(required=True)
+
+    generate = subparsers.add_parser(
+        "generate", help="Escribir datasets sintéticos en CSV"
+    )
+    _add_scale_args(generate)
+    generate.add_argument("--out", type=Path, required=True)
+    generate.set_defaults(func=cmd_generate)
+
+    run = subparsers.add_parser(
+        "run", help="Tiempos por etapa de get_summary y DBF a CSV"
+    )
+    _add_scale_args(run)
+    run.add_argument("--repeats", type=int, default=5)
+    run.add_argument("--skip-dbf", action="store_true")
+    run.add_argument("--output", type=Path)
+    run.set_defaults(func=cmd_run)
+
+    load = subparsers.add_parser(
+        "load", help="Prueba de carga HTTP con percentiles de latencia"
+    )
+    load.add_argument(
+        "--url", help="URL base de un servidor en marcha; por defecto la app en proceso"
+    )
+    load.add_argument("--data-dir", type=Path, help="DATA_DIR para la app en proceso")
+    load.add_argument("--path", default="/api/data/summary")
+    load.add_argument("--start-date", type=int, default=202101)
+    load.add_argument("--end-date", type=int, default=202312)
+    load.add_argument("--requests", type=int, default=100)
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--output", type=Path)
+    load.set_defaults(func=cmd_load)
+
+    imports = subparsers.add_parser(
+        "imports", help="Tiempo de importación por módulo al arrancar un worker"
+    )
+    imports.add_argument("--module", default="src.main")
+    imports.add_argument("--repeats", type=int, default=5)
+    imports.add_argument(
+        "--depth", type=int, default=1, help="Niveles de importación a reportar"
+    )
+    imports.add_argument("--top", type=int, default=20)
+    imports.add_argument("--output", type=Path)
+    imports.set_defaults(func=cmd_imports)
+
+    compare = subparsers.add_parser(
+        "compare", help="Comparar dos archivos de resultados"
+    )
+    compare.add_argument("baseline", type=Path)
+    compare.add_argument("candidate", type=Path)
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Compara dos archivos de resultados de benchmarks."""
+
+import json
+from pathlib import Path
+from typing import Any, Iterator
+
+# Métrica representativa de cada tipo de resultado.
+KEYS = ("median_ms", "p50", "p95", "p99")
+
+
+def _flatten(data: Any, prefix: str = "") -> Iterator[tuple[str, float]]:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(data, (int, float)) and prefix.rsplit(".", 1)[-1] in KEYS:
+        yield prefix, float(data)
+
+
+def compare_results(baseline_path: Path, candidate_path: Path) -> list[dict[str, Any]]:
+    baseline = dict(_flatten(json.loads(baseline_path.read_text())["results"]))
+    candidate = dict(_flatten(json.loads(candidate_path.read_text())["results"]))
+
+    rows = []
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key], candidate[key]
+        change = (after - before) / before * 100 if before else 0.0
+        rows.append(
+            {
+                "metric": key,
+                "baseline": before,
+                "candidate": after,
+                "change_pct": change,
+            }
+        )
+    return rows
+
+
+def format_rows(rows: list[dict[str, Any]]) -> str:
+    width = max((len(row["metric"]) for row in rows), default=10)
+    lines = [f"{'metric':<{width}}  {'baseline':>10}  {'candidate':>10}  {'change':>8}"]
+    for row in rows:
+        lines.append(
+            f"{row['metric']:<{width}}  {row['baseline']:>10.2f}  {row['candidate']:>10.2f}  "
+            f"{row['change_pct']:>+7.1f}%"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,73 @@
+"""Tiempo de importación por módulo de la app, medido con `python -X importtime`.
+
+Cada ejecución es un intérprete nuevo: es lo que paga un worker de gunicorn (o
+un reinicio sin preload) antes de poder responder /healthcheck.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, float, float]]:
+    """(módulo, profundidad, ms propios, ms acumulados) por línea de -X importtime."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2 - 1
+        rows.append(
+            (name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000)
+        )
+    return rows
+
+
+def measure_imports(module: str) -> list[tuple[str, int, float, float]]:
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env=env,
+        check=True,
+    )
+    return parse_importtime(completed.stderr)
+
+
+def bench_imports(module: str, repeats: int, depth: int) -> dict[str, Any]:
+    """Mediana del tiempo de importación de `module` y de sus módulos hasta `depth`.
+
+    Los módulos del proyecto (src.*) se reportan siempre, sea cual sea su nivel.
+    """
+    cumulative: dict[str, list[float]] = {}
+    own: dict[str, list[float]] = {}
+    totals = []
+    for _ in range(repeats):
+        rows = measure_imports(module)
+        for name, level, self_ms, cumulative_ms in rows:
+            if level <= depth or name.startswith("src."):
+                cumulative.setdefault(name, []).append(cumulative_ms)
+                own.setdefault(name, []).append(self_ms)
+        totals.append(sum(self_ms for _, _, self_ms, _ in rows))
+
+    modules = {
+        name: {
+            "median_ms": statistics.median(values),
+            "self_ms": statistics.median(own[name]),
+        }
+        for name, values in cumulative.items()
+    }
+    return {
+        "module": module,
+        "total": {"median_ms": statistics.median(totals)},
+        "modules": dict(
+            sorted(modules.items(), key=lambda item: item[1]["median_ms"], reverse=True)
+        ),
+    }
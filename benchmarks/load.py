@@ -0,0 +1,89 @@
+"""Prueba de carga HTTP contra los endpoints de análisis."""
+
+import asyncio
+import time
+from typing import Any
+
+import httpx
+import numpy as np
+
+
+async def _worker(
+    client: httpx.AsyncClient,
+    path: str,
+    params: dict[str, Any],
+    remaining: list[int],
+    latencies: list[float],
+    statuses: dict[int, int],
+) -> None:
+    while remaining[0] > 0:
+        remaining[0] -= 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0  # error de conexión / timeout
+        latencies.append(time.perf_counter() - start)
+        statuses[status] = statuses.get(status, 0) + 1
+
+
+async def run_load_test(
+    path: str,
+    params: dict[str, Any],
+    requests: int,
+    concurrency: int,
+    base_url: str | None = None,
+    timeout: float = 60.0,
+) -> dict[str, Any]:
+    """Envía `requests` GET a `path` con `concurrency` peticiones en curso.
+
+    Sin `base_url` la app se sirve en el propio proceso con un transporte ASGI:
+    se mide la aplicación sin la red ni gunicorn de por medio.
+    """
+    if base_url:
+        client = httpx.AsyncClient(base_url=base_url, timeout=timeout)
+    else:
+        from src.main import app
+
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench",
+            timeout=timeout,
+        )
+
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    remaining = [requests]
+    async with client:
+        # Una petición de calentamiento, fuera de la medición.
+        await client.get(path, params=params)
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                _worker(client, path, params, remaining, latencies, statuses)
+                for _ in range(concurrency)
+            )
+        )
+        elapsed = time.perf_counter() - start
+
+    values = np.asarray(latencies) * 1000
+    return {
+        "target": base_url or "in-process",
+        "path": path,
+        "params": params,
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": elapsed,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "latency_ms": {
+            "min": float(values.min()),
+            "p50": float(np.percentile(values, 50)),
+            "p90": float(np.percentile(values, 90)),
+            "p95": float(np.percentile(values, 95)),
+            "p99": float(np.percentile(values, 99)),
+            "max": float(values.max()),
+            "mean": float(values.mean()),
+        },
+    }
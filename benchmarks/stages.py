@@ -0,0 +1,122 @@
+"""Micro-benchmarks por etapa de `build_summary` y de la conversión de DBF a CSV."""
+
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import Scale, write_dbf
+from src.analytics.datasets import (
+    MPRODUCTO_CSV,
+    MSTOCKALM_CSV,
+    TFORMDET_CSV,
+    read_csv_data,
+)
+from src.analytics.summary import build_summary, prepare_consumption
+from src.analytics.timing import StageTimer
+
+SUMMARY_STAGES = [
+    "load",
+    "prepare",
+    "filter",
+    "pivot",
+    "merge",
+    "classify",
+    "serialize",
+]
+
+
+def describe(samples: list[float]) -> dict[str, float]:
+    """Estadísticas en milisegundos."""
+    values = np.asarray(samples) * 1000
+    return {
+        "runs": len(values),
+        "min_ms": float(values.min()),
+        "median_ms": float(np.median(values)),
+        "mean_ms": float(values.mean()),
+        "p95_ms": float(np.percentile(values, 95)),
+        "max_ms": float(values.max()),
+    }
+
+
+def bench_summary(
+    data_dir: Path, scale: Scale, repeats: int, real_time: bool = False
+) -> dict[str, Any]:
+    annomes = scale.annomes
+    samples: dict[str, list[float]] = {
+        stage: [] for stage in SUMMARY_STAGES + ["total"]
+    }
+    rows = 0
+
+    for _ in range(repeats):
+        timer = StageTimer()
+        start = time.perf_counter()
+        with timer.stage("load"):
+            tformdet = read_csv_data(TFORMDET_CSV, data_dir)
+            mstockalm = read_csv_data(MSTOCKALM_CSV, data_dir)
+            mproducto = read_csv_data(MPRODUCTO_CSV, data_dir)
+        with timer.stage("prepare"):
+            consumption = prepare_consumption(tformdet)
+        result = build_summary(
+            consumption,
+            mstockalm,
+            mproducto,
+            annomes[0],
+            annomes[-1],
+            real_time=real_time,
+            timer=timer,
+        )
+        samples["total"].append(time.perf_counter() - start)
+        for stage in SUMMARY_STAGES:
+            samples[stage].append(timer.durations.get(stage, 0.0))
+        rows = result["count"]
+
+    return {
+        "real_time": real_time,
+        "input_rows": len(tformdet),
+        "output_rows": rows,
+        "stages": {stage: describe(values) for stage, values in samples.items()},
+    }
+
+
+def bench_dbf(frames: dict[str, pd.DataFrame], repeats: int) -> dict[str, Any]:
+    # Importado aquí: dbf_loader depende de dbfread, que solo hace falta para esta etapa.
+    from src.data.dbf_loader import multiple_dbf_to_csv, process_dbf_to_csv
+    from src.data.sources import campos_tformdet
+
+    tformdet = frames[TFORMDET_CSV]
+    years = sorted(tformdet["ANNOMES"].floordiv(100).unique())
+    results: dict[str, Any] = {"input_rows": len(tformdet), "files": len(years)}
+
+    with tempfile.TemporaryDirectory(prefix="bench-dbf-") as tmp:
+        tmp_dir = Path(tmp)
+        single_dbf = tmp_dir / "TFORMDET.DBF"
+        write_dbf(tformdet, single_dbf)
+        yearly_dbfs = []
+        for year in years:
+            path = tmp_dir / f"TFORMDET_{year}.DBF"
+            write_dbf(tformdet[tformdet["ANNOMES"] // 100 == year], path)
+            yearly_dbfs.append(path)
+
+        single, multiple = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            process_dbf_to_csv(single_dbf, tmp_dir / "single.csv", campos_tformdet)
+            single.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            multiple_dbf_to_csv(
+                yearly_dbfs,
+                tmp_dir / "multiple.csv",
+                campos_tformdet,
+                table="tformdet",
+                quarantine_dir=tmp_dir / "cuarentena",
+            )
+            multiple.append(time.perf_counter() - start)
+
+    results["process_dbf_to_csv"] = describe(single)
+    results["multiple_dbf_to_csv"] = describe(multiple)
+    return results
@@ -0,0 +1,170 @@
+"""Datasets sintéticos de tformdet/mstockalm/mproducto a escala configurable."""
+
+import datetime
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.datasets import MPRODUCTO_CSV, MSTOCKALM_CSV, TFORMDET_CSV
+
+MEDTIP_VALUES = ["M", "I"]
+MEDEST_VALUES = ["_", "E", "S"]
+MEDFF_VALUES = ["TABLET", "INYECT", "JARABE", "UNIDAD", "CREMA"]
+
+
+@dataclass(frozen=True)
+class Scale:
+    products: int = 1_000
+    months: int = 36
+    warehouses: int = 4
+    start_annomes: int = 202101
+
+    @property
+    def annomes(self) -> list[int]:
+        year, month = divmod(self.start_annomes, 100)
+        values = []
+        for _ in range(self.months):
+            values.append(year * 100 + month)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return values
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "products": self.products,
+            "months": self.months,
+            "warehouses": self.warehouses,
+            "start_annomes": self.start_annomes,
+        }
+
+
+def generate_datasets(scale: Scale, seed: int = 0) -> dict[str, pd.DataFrame]:
+    """Tablas de origen con una fila de tformdet por producto, mes y almacén."""
+    rng = np.random.default_rng(seed)
+    codes = np.array([f"{i:05d}" for i in range(1, scale.products + 1)])
+    almcods = np.array([f"06162F{i:04d}" for i in range(1, scale.warehouses + 1)])
+    annomes = np.array(scale.annomes)
+
+    mproducto = pd.DataFrame(
+        {
+            "MEDCOD": codes,
+            "MEFCOD": "",
+            "MEDNOM": [f"PRODUCTO SINTETICO {c}" for c in codes],
+            "MEDPRES": "",
+            "MEDCNC": "100 mg",
+            "MEDTIP": rng.choice(MEDTIP_VALUES, scale.products),
+            "MEDPET": "_",
+            "MEDFF": rng.choice(MEDFF_VALUES, scale.products),
+            "MEDEST": rng.choice(MEDEST_VALUES, scale.products),
+            "MEDREGSAN": "",
+            "ESTADO": "C",
+        }
+    )
+
+    stock_codes = np.repeat(codes, scale.warehouses)
+    mstockalm = pd.DataFrame(
+        {
+            "ALMCOD": np.tile(almcods, scale.products),
+            "MEDCOD": stock_codes,
+            "STKSALDO": rng.integers(0, 2_000, len(stock_codes)),
+            "STKPRECIO": rng.uniform(0.01, 50, len(stock_codes)).round(2),
+            "STKFECHULT": "2024-12-31 00:00:00",
+            "FLG_SOCKET": "",
+        }
+    )
+
+    # Orden producto -> mes -> almacén, igual que los DBF exportados por año.
+    n = scale.products * scale.months * scale.warehouses
+    base_consumo = rng.gamma(2.0, 40.0, scale.products)
+    consumo = rng.poisson(
+        np.repeat(base_consumo, scale.months * scale.warehouses) / scale.warehouses
+    )
+    expiry = pd.Timestamp("2025-01-01") + pd.to_timedelta(
+        rng.integers(0, 1_000, n), unit="D"
+    )
+    tformdet = pd.DataFrame(
+        {
+            "CODIGO_EJE": "040",
+            "CODIGO_PRE": np.tile(almcods, scale.products * scale.months),
+            "TIPSUM": "D",
+            "ANNOMES": np.tile(np.repeat(annomes, scale.warehouses), scale.products),
+            "CODIGO_MED": np.repeat(codes, scale.months * scale.warehouses),
+            "PRECIO": np.repeat(
+                rng.uniform(0.01, 50, scale.products).round(2),
+                scale.months * scale.warehouses,
+            ),
+            "INGRE": rng.poisson(30, n),
+            "VENTA": (consumo * 0.5).astype(int),
+            "SIS": (consumo * 0.4).astype(int),
+            "INTERSAN": consumo
+            - (consumo * 0.5).astype(int)
+            - (consumo * 0.4).astype(int),
+            "STOCK_FIN": rng.integers(0, 1_000, n),
+            "FEC_EXP": expiry.strftime("%Y-%m-%d"),
+            "MEDLOTE": [f"L{i % 997:04d}" for i in range(n)],
+            "MEDREGSAN": "",
+        }
+    )
+
+    return {TFORMDET_CSV: tformdet, MSTOCKALM_CSV: mstockalm, MPRODUCTO_CSV: mproducto}
+
+
+def write_datasets(frames: dict[str, pd.DataFrame], out_dir: Path) -> None:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for filename, frame in frames.items():
+        frame.to_csv(out_dir / filename, index=False)
+
+
+def write_dbf(frame: pd.DataFrame, path: Path) -> None:
+    """Escribe `frame` como un archivo dBase III legible por dbfread.
+
+    Las columnas enteras son campos N, las float N con 2 decimales y el resto C.
+    """
+    fields = []
+    columns = []
+    for name in frame.columns:
+        series = frame[name]
+        if pd.api.types.is_integer_dtype(series):
+            text = series.astype(str)
+            fields.append((name, b"N", max(int(text.str.len().max()), 1), 0))
+        elif pd.api.types.is_float_dtype(series):
+            text = series.map("{:.2f}".format)
+            fields.append((name, b"N", max(int(text.str.len().max()), 1), 2))
+        else:
+            text = series.fillna("").astype(str)
+            fields.append((name, b"C", max(int(text.str.len().max()), 1), 0))
+        columns.append(text.tolist())
+
+    record_length = 1 + sum(length for _, _, length, _ in fields)
+    header_length = 32 + 32 * len(fields) + 1
+    today = datetime.date.today()
+
+    with open(path, "wb") as fh:
+        fh.write(
+            struct.pack(
+                "<BBBBIHH20x",
+                0x03,
+                today.year - 1900,
+                today.month,
+                today.day,
+                len(frame),
+                header_length,
+                record_length,
+            )
+        )
+        for name, kind, length, decimals in fields:
+            fh.write(
+                struct.pack(
+                    "<11sc4xBB14x", name.encode("ascii")[:10], kind, length, decimals
+                )
+            )
+        fh.write(b"\r")
+        for values in zip(*columns):
+            record = [b" "]
+            for (_, kind, length, _), value in zip(fields, values):
+                raw = value.encode("latin1", errors="replace")
+                record.append(raw.rjust(length) if kind == b"N" else raw.ljust(length))
+            fh.write(b"".join(record))
+        fh.write(b"\x1a")
@@ -1,3 +1,4 @@
+import gc
 import multiprocessing
 
 from pydantic import Field
@@ -13,6 +14,19 @@ except ImportError:
     pass
 
 
+def when_ready(server):
+    # Con preload_app la app ya está importada en el master: calentar aquí hace que
+    # los workers hereden los datasets e índices (copy-on-write) al hacer fork.
+    if not server.cfg.preload_app:
+        return
+
+    from src.analytics.warmup import warm_up
+
+    warm_up()
+    # Saca los objetos ya creados del GC para que no toque (y copie) sus páginas.
+    gc.freeze()
+
+
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
@@ -31,6 +45,9 @@ class Settings(BaseSettings):
     keepalive: int = 5
     log_level: str = "INFO"
     log_config: str = "/src/logging_production.ini"
+    # Opcional (PRELOAD_APP=true), como antes: con preload la app se importa en el
+    # master y un cambio de código exige reiniciarlo, no basta con HUP.
+    preload_app: bool = False
 
     @property
     def computed_bind(self) -> str:
@@ -63,3 +80,4 @@ graceful_timeout = settings.graceful_timeout
 timeout = settings.timeout
 keepalive = settings.keepalive
 logconfig = settings.log_config
+preload_app = settings.preload_app
@@ -1 +1,4 @@
- 
\ No newline at end of file
+import time
+
+# Inicio de la importación de la app; /readiness informa el tiempo de arranque.
+IMPORT_STARTED = time.perf_counter()
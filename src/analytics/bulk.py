@@ -0,0 +1,175 @@
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.datasets import MSTOCKALM_CSV, TFORMDET_CSV, register_index
+from src.analytics.expiry import CPMA_MONTHS
+from src.analytics.forecast import HierarchicalForecast
+from src.analytics.summary import (
+    current_snapshot,
+    prepare_consumption,
+    prepare_monthly_consumption,
+    situacion_array,
+)
+from src.analytics.warehouses import prepare_warehouse_stock
+
+# Registros por trozo de la respuesta: las métricas se calculan trozo a trozo.
+BULK_BATCH_SIZE = 1_000
+
+RECORD_FIELDS = (
+    "CODIGO_MED",
+    "FOUND",
+    "CPMA",
+    "STOCK_FIN",
+    "NIVELES",
+    "SITUACION",
+    "PRONOSTICO",
+)
+
+
+@dataclass
+class ProductStatus:
+    """Estado actual de cada producto como arrays alineados con `codes` (ordenado).
+
+    CPMA es el de los últimos CPMA_MONTHS meses con datos de tformdet y STOCK_FIN
+    la suma de sus lotes en el último ANNOMES de tformdet (`current_snapshot`):
+    un producto que ese mes no informa stock tiene 0, no el de un mes anterior.
+    STOCK_REAL es el STKSALDO de mstockalm. Un producto que solo aparece en una
+    de las tablas tiene 0 en lo que falta.
+    """
+
+    codes: np.ndarray
+    cpma: np.ndarray
+    stock_fin: np.ndarray
+    stock_real: np.ndarray
+    months: list[int]
+
+    def positions(self, requested: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Posición en `codes` de cada código pedido y si existe."""
+        positions = np.searchsorted(self.codes, requested)
+        positions = np.minimum(positions, max(len(self.codes) - 1, 0))
+        found = (
+            self.codes[positions] == requested
+            if len(self.codes)
+            else np.zeros(len(requested), dtype=bool)
+        )
+        return positions, found
+
+
+@register_index("product_status", TFORMDET_CSV, MSTOCKALM_CSV)
+def build_product_status(
+    tformdet_orig: pd.DataFrame, mstockalm_orig: pd.DataFrame
+) -> ProductStatus:
+    monthly = prepare_monthly_consumption(tformdet_orig)
+    codes = monthly["CODIGO_MED"].to_numpy()
+    annomes = monthly["ANNOMES"].to_numpy()
+    months = np.sort(np.unique(annomes))[-CPMA_MONTHS:]
+
+    # `monthly` está ordenado por (CODIGO_MED, ANNOMES): un tramo por producto.
+    boundaries = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    recent = np.where(
+        np.isin(annomes, months), monthly["TOTAL_CONSUMO"].to_numpy(dtype=float), 0.0
+    )
+    consumption = pd.Series(
+        np.add.reduceat(recent, boundaries) / max(len(months), 1)
+        if len(monthly)
+        else np.zeros(0),
+        index=codes[boundaries],
+    )
+    stock_fin = (
+        current_snapshot(prepare_consumption(tformdet_orig))
+        .groupby("CODIGO_MED")["STOCK_FIN"]
+        .sum()
+    )
+    stock_real = (
+        prepare_warehouse_stock(mstockalm_orig).groupby("CODIGO_MED")["STOCK_FIN"].sum()
+    )
+
+    products = np.union1d(
+        consumption.index, np.union1d(stock_fin.index, stock_real.index)
+    )
+    return ProductStatus(
+        codes=products,
+        cpma=consumption.reindex(products).fillna(0.0).to_numpy(dtype=float),
+        stock_fin=stock_fin.reindex(products).fillna(0.0).to_numpy(dtype=float),
+        stock_real=stock_real.reindex(products).fillna(0.0).to_numpy(dtype=float),
+        months=[int(month) for month in months],
+    )
+
+
+def gather_products(
+    status: ProductStatus,
+    forecast: HierarchicalForecast,
+    codes: list[str],
+    real_time: bool = False,
+) -> dict[str, Any]:
+    """Posición de todos los `codes` (en el orden pedido) con una sola búsqueda.
+
+    Las métricas no se calculan aquí sino por trozos en `stream_products`. Los
+    códigos desconocidos vuelven con FOUND en False y las métricas en None.
+    """
+    requested = np.asarray(codes, dtype=object)
+    positions, found = status.positions(requested)
+    return {
+        "codes": requested,
+        "positions": positions,
+        "found": found,
+        "cpma": status.cpma,
+        "stock": status.stock_real if real_time else status.stock_fin,
+        "next_month": forecast.next_month(),
+        "months": status.months,
+        "forecast_month": forecast.months[0],
+    }
+
+
+def _batch_records(result: dict[str, Any], start: int, end: int) -> list[dict]:
+    """Métricas de los códigos pedidos entre `start` y `end`, como registros."""
+    codes = result["codes"][start:end]
+    positions = result["positions"][start:end]
+    found = result["found"][start:end]
+
+    cpma = np.where(found, result["cpma"][positions], 0.0)
+    stock_fin = np.where(found, result["stock"][positions], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        niveles = stock_fin / cpma
+    niveles = np.where(np.isfinite(niveles), niveles, 0.0)
+    situacion = situacion_array(niveles, cpma, stock_fin)
+    pronostico = result["next_month"].reindex(codes).to_numpy(dtype=float)
+
+    columns = [
+        codes.tolist(),
+        found.tolist(),
+        *(
+            np.where(found, values, None).tolist()
+            for values in (cpma, stock_fin, niveles, situacion)
+        ),
+        np.where(np.isnan(pronostico), None, pronostico).tolist(),
+    ]
+    return [dict(zip(RECORD_FIELDS, row)) for row in zip(*columns)]
+
+
+def stream_products(
+    result: dict[str, Any], batch_size: int = BULK_BATCH_SIZE
+) -> Iterator[bytes]:
+    """Respuesta JSON de `gather_products` en trozos de `batch_size` registros.
+
+    Cada trozo calcula sus métricas al serializarse, así la memoria extra es la
+    de un trozo y no la de todos los códigos pedidos.
+    """
+    months = result["months"]
+    header = {
+        "count": len(result["codes"]),
+        "found": int(result["found"].sum()),
+        "cpma_months": [str(months[0]), str(months[-1])] if months else [],
+        "forecast_month": str(result["forecast_month"]),
+    }
+    yield json.dumps(header)[:-1].encode() + b', "data": ['
+    for start in range(0, len(result["codes"]), batch_size):
+        records = _batch_records(result, start, start + batch_size)
+        chunk = json.dumps(records)[1:-1]
+        yield (b", " if start else b"") + chunk.encode()
+    yield b"]}"
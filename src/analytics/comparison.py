@@ -0,0 +1,234 @@
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.summary import (
+    DESCRIPTIVE_TEXT_COLS,
+    MPRODUCTO_COLS,
+    current_warehouse_stock,
+    filter_products,
+    situacion_array,
+)
+from src.analytics.timing import StageTimer
+
+MAX_WINDOWS = 12
+
+Window = tuple[int, int]  # (ANNOMES inicio, ANNOMES fin), ambos incluidos
+
+
+def parse_windows(values: list[str]) -> list[Window]:
+    """'202401-202403' (o varios separados por coma) -> [(202401, 202403)], en orden."""
+    windows = []
+    for item in values:
+        for text in item.split(","):
+            text = text.strip()
+            if not text:
+                continue
+            start, sep, end = text.partition("-")
+            if not sep or not start.strip().isdigit() or not end.strip().isdigit():
+                raise ValueError(
+                    f"Período inválido: {text}. "
+                    "Debe ser ANNOMES-ANNOMES (ej. 202401-202403)."
+                )
+            start_annomes, end_annomes = int(start), int(end)
+            if start_annomes > end_annomes:
+                raise ValueError(
+                    f"Período inválido: {text}. El inicio es posterior al fin."
+                )
+            windows.append((start_annomes, end_annomes))
+    if not windows:
+        raise ValueError("Debe indicar al menos un período.")
+    if len(windows) > MAX_WINDOWS:
+        raise ValueError(f"Se admiten como máximo {MAX_WINDOWS} períodos.")
+    return windows
+
+
+def window_metrics(
+    monthly: pd.DataFrame,
+    windows: list[Window],
+    stock: pd.Series | None = None,
+    months: np.ndarray | None = None,
+) -> dict[str, Any]:
+    """CPMA, CONSUMO_MEN, STOCK_FIN, NIVELES y SITUACION de todos los períodos a la vez.
+
+    `monthly` viene de `prepare_monthly_consumption` (ordenado por CODIGO_MED y
+    ANNOMES). Cada métrica es una matriz productos x períodos; las celdas de un
+    producto sin registros en el período quedan en NaN (`present` en False).
+    Con `stock` (STOCK_FIN por CODIGO_MED) se usa ese stock en todos los períodos
+    en vez del último STOCK_FIN de cada período. `months` son los ANNOMES con
+    datos sobre los que se promedia el CPMA (por defecto, los de `monthly`).
+    """
+    codes = monthly["CODIGO_MED"].to_numpy()
+    annomes = monthly["ANNOMES"].to_numpy()
+    total = monthly["TOTAL_CONSUMO"].to_numpy(dtype=float)
+    starts = np.array([start for start, _ in windows])
+    ends = np.array([end for _, end in windows])
+
+    # Filas de cada producto: tramos contiguos porque `monthly` está ordenado.
+    boundaries = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    products = codes[boundaries]
+
+    inside = (annomes[:, None] >= starts) & (
+        annomes[:, None] <= ends
+    )  # filas x períodos
+    consumo = np.add.reduceat(np.where(inside, total[:, None], 0.0), boundaries)
+    consumo_men = np.add.reduceat(
+        (inside & (total[:, None] > 0)).astype(int), boundaries
+    )
+    # Posición del último mes de cada producto dentro de cada período (-1 si no hay).
+    positions = np.arange(len(monthly))[:, None]
+    last = np.maximum.reduceat(np.where(inside, positions, -1), boundaries)
+    present = last >= 0
+
+    # El CPMA promedia sobre los meses con datos del período, como en el resumen.
+    if months is None:
+        months = np.unique(annomes)
+    n_months = ((months[:, None] >= starts) & (months[:, None] <= ends)).sum(axis=0)
+    cpma = consumo / np.maximum(n_months, 1)
+
+    if stock is None:
+        stock_fin = monthly["STOCK_FIN"].to_numpy(dtype=float)[np.maximum(last, 0)]
+    else:
+        current = stock.reindex(products).fillna(0.0).to_numpy(dtype=float)
+        stock_fin = np.broadcast_to(current[:, None], cpma.shape)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        niveles = stock_fin / cpma
+    niveles = np.where(np.isfinite(niveles), niveles, 0.0)
+
+    situacion = situacion_array(niveles, cpma, stock_fin)
+    return {
+        "products": products,
+        "months": n_months,
+        "present": present,
+        "CPMA": np.where(present, cpma, np.nan),
+        "CONSUMO_MEN": consumo_men,
+        "STOCK_FIN": np.where(present, stock_fin, np.nan),
+        "NIVELES": np.where(present, niveles, np.nan),
+        "SITUACION": np.where(present, situacion, None),
+    }
+
+
+def _number(value: float) -> float | None:
+    return None if np.isnan(value) else float(value)
+
+
+def _records(
+    result: dict[str, Any], windows: list[Window], attributes: pd.DataFrame
+) -> list[dict[str, Any]]:
+    present = result["present"]
+    cpma, stock_fin, niveles = result["CPMA"], result["STOCK_FIN"], result["NIVELES"]
+    consumo_men, situacion = result["CONSUMO_MEN"], result["SITUACION"]
+
+    # Diferencias de cada período contra el primero (el de referencia).
+    both = present & present[:, :1]
+    cpma_delta = np.where(both, cpma - cpma[:, :1], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cpma_delta_pct = np.where(
+            both & (cpma[:, :1] != 0), cpma_delta / cpma[:, :1] * 100, np.nan
+        )
+    stock_delta = np.where(both, stock_fin - stock_fin[:, :1], np.nan)
+    niveles_delta = np.where(both, niveles - niveles[:, :1], np.nan)
+
+    records = []
+    codes = result["products"].tolist()
+    for i, (code, attrs) in enumerate(zip(codes, attributes.to_dict("records"))):
+        periods: list[dict[str, Any] | None] = []
+        for k in range(len(windows)):
+            if not present[i, k]:
+                periods.append(None)
+                continue
+            period = {
+                "CPMA": float(cpma[i, k]),
+                "CONSUMO_MEN": int(consumo_men[i, k]),
+                "STOCK_FIN": float(stock_fin[i, k]),
+                "NIVELES": float(niveles[i, k]),
+                "SITUACION": situacion[i, k],
+            }
+            if k > 0:
+                period.update(
+                    {
+                        "CPMA_DELTA": _number(cpma_delta[i, k]),
+                        "CPMA_DELTA_PCT": _number(cpma_delta_pct[i, k]),
+                        "STOCK_FIN_DELTA": _number(stock_delta[i, k]),
+                        "NIVELES_DELTA": _number(niveles_delta[i, k]),
+                        "SITUACION_CAMBIO": (
+                            bool(situacion[i, k] != situacion[i, 0])
+                            if both[i, k]
+                            else None
+                        ),
+                    }
+                )
+            periods.append(period)
+        records.append({"CODIGO_MED": code, **attrs, "periods": periods})
+    return records
+
+
+def build_comparison(
+    monthly: pd.DataFrame,
+    mstockalm_orig: pd.DataFrame,
+    mproducto_orig: pd.DataFrame,
+    windows: list[Window],
+    product_type_list: list[str] | None = None,
+    strategy_list: list[str] | None = None,
+    real_time: bool = False,
+    timer: StageTimer | None = None,
+) -> dict[str, Any]:
+    """Métricas del resumen para varios períodos y sus diferencias contra el primero.
+
+    Se calculan todos los períodos en una sola pasada sobre el consumo mensual.
+    Las deltas (CPMA_DELTA, CPMA_DELTA_PCT, STOCK_FIN_DELTA, NIVELES_DELTA,
+    SITUACION_CAMBIO) de cada período son contra `windows[0]`.
+    """
+    timer = timer or StageTimer()
+    product_type_list = product_type_list or []
+    strategy_list = strategy_list or []
+
+    with timer.stage("filter"):
+        mproducto_unique = filter_products(
+            mproducto_orig, product_type_list, strategy_list
+        )
+        lo = min(start for start, _ in windows)
+        hi = max(end for _, end in windows)
+        mask = (monthly["ANNOMES"] >= lo) & (monthly["ANNOMES"] <= hi)
+        if product_type_list or strategy_list:
+            mask &= monthly["CODIGO_MED"].isin(mproducto_unique["MEDCOD"])
+        monthly = monthly[mask]
+
+        stock = None
+        if real_time:
+            stock_df = current_warehouse_stock(mstockalm_orig)
+            stock = stock_df.groupby("MEDCOD")["STKSALDO"].sum()
+
+    with timer.stage("compare"):
+        if monthly.empty:
+            result = None
+        else:
+            result = window_metrics(monthly, windows, stock)
+
+    with timer.stage("serialize"):
+        months = result["months"] if result is not None else np.zeros(len(windows))
+        periods = [
+            {"start_date": start, "end_date": end, "anomes": int(n), "count": 0}
+            for (start, end), n in zip(windows, months)
+        ]
+        if result is None:
+            return {"count": 0, "periods": periods, "data": []}
+
+        attr_cols = [
+            col for col in MPRODUCTO_COLS[1:] if col in mproducto_unique.columns
+        ]
+        attributes = mproducto_unique.set_index("MEDCOD")[attr_cols].reindex(
+            result["products"]
+        )
+        for col in DESCRIPTIVE_TEXT_COLS:
+            if col in attributes.columns:
+                attributes[col] = attributes[col].fillna("Desconocido")
+        attributes = attributes.astype(object).where(attributes.notna(), None)
+
+        data = _records(result, windows, attributes)
+        for period, count in zip(periods, result["present"].sum(axis=0)):
+            period["count"] = int(count)
+
+    return {"count": len(data), "periods": periods, "data": data}
@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+from src import metrics
+from src.config import settings
+from src.data.validation import SCHEMAS, analysis_frame
+
+DATA_DIR = settings.DATA_DIR
+
+TFORMDET_CSV = "tformdet.csv"
+MSTOCKALM_CSV = "mstockalm.csv"
+MPRODUCTO_CSV = "mproducto.csv"
+DATASETS = (TFORMDET_CSV, MSTOCKALM_CSV, MPRODUCTO_CSV)
+
+Version = tuple[int, int]  # (mtime_ns, size)
+
+# ruta -> (versión, DataFrame). Los llamadores deben hacer .copy() antes de
+# modificar el DataFrame devuelto.
+_cache: dict[Path, tuple[Version, pd.DataFrame]] = {}
+_cache_lock = threading.Lock()
+
+# Índices: estructuras derivadas de uno o más datasets, reconstruidas solo cuando
+# cambia alguno de ellos. nombre -> (datasets de origen, constructor)
+_index_builders: dict[str, tuple[tuple[str, ...], Callable[..., Any]]] = {}
+_indexes: dict[str, tuple[tuple[Version, ...], Any]] = {}
+_index_lock = threading.Lock()
+
+
+def _read(file_path: Path) -> pd.DataFrame:
+    """CSV de `file_path`; los de las tablas con esquema se validan al leerlos."""
+    table = file_path.stem
+    if table not in SCHEMAS:
+        return pd.read_csv(file_path)
+    # dtype=str: los códigos conservan los ceros ("00946"); la validación tipa.
+    return analysis_frame(pd.read_csv(file_path, dtype=str), table)
+
+
+def read_csv_data(filename: str, data_dir: Path = DATA_DIR) -> pd.DataFrame:
+    file_path = data_dir / filename
+    if not file_path.exists():
+        raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
+    return _read(file_path)
+
+
+def _load(filename: str, data_dir: Path) -> tuple[Version, pd.DataFrame]:
+    file_path = data_dir / filename
+    try:
+        stat = file_path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Archivo no encontrado: {file_path}")
+    version = (stat.st_mtime_ns, stat.st_size)
+    dataset = file_path.stem
+
+    with _cache_lock:
+        cached = _cache.get(file_path)
+        if cached is not None and cached[0] == version:
+            metrics.DATASET_CACHE.labels(dataset=dataset, result="hit").inc()
+            return cached
+
+        metrics.DATASET_CACHE.labels(dataset=dataset, result="miss").inc()
+        entry = (version, _read(file_path))
+        _cache[file_path] = entry
+        return entry
+
+
+def load_csv_data(filename: str, data_dir: Path = DATA_DIR) -> pd.DataFrame:
+    """Como `read_csv_data`, en caché en memoria hasta que cambie el archivo."""
+    return _load(filename, data_dir)[1]
+
+
+def register_index(name: str, *sources: str) -> Callable:
+    """Registra `build(*datasets de origen)` como constructor del índice `name`."""
+
+    def decorator(build: Callable[..., Any]) -> Callable[..., Any]:
+        _index_builders[name] = (sources, build)
+        return build
+
+    return decorator
+
+
+def get_index(name: str) -> Any:
+    sources, build = _index_builders[name]
+    entries = [_load(source, DATA_DIR) for source in sources]
+    versions = tuple(version for version, _ in entries)
+
+    with _index_lock:
+        cached = _indexes.get(name)
+        if cached is not None and cached[0] == versions:
+            metrics.DATASET_CACHE.labels(dataset=name, result="hit").inc()
+            return cached[1]
+
+        metrics.DATASET_CACHE.labels(dataset=name, result="miss").inc()
+        value = build(*(frame for _, frame in entries))
+        _indexes[name] = (versions, value)
+        return value
+
+
+def registered_indexes() -> list[str]:
+    return list(_index_builders)
+
+
+# Las esperas de `_cache_lock`/`_index_lock` (p. ej. mientras el warm-up construye
+# un índice) y la lectura o construcción misma ocurren en un hilo: el event loop
+# sigue atendiendo las demás peticiones.
+async def load_csv_data_async(filename: str) -> pd.DataFrame:
+    """`load_csv_data` fuera del event loop."""
+    return await asyncio.to_thread(load_csv_data, filename)
+
+
+async def get_index_async(name: str) -> Any:
+    """`get_index` fuera del event loop."""
+    return await asyncio.to_thread(get_index, name)
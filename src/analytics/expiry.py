@@ -0,0 +1,222 @@
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.datasets import TFORMDET_CSV, register_index
+from src.analytics.summary import (
+    DESCRIPTIVE_TEXT_COLS,
+    MPRODUCTO_COLS,
+    current_snapshot,
+    filter_products,
+    prepare_consumption,
+    prepare_monthly_consumption,
+)
+
+# Meses de consumo (hasta el último ANNOMES de tformdet) con los que se calcula el CPMA.
+CPMA_MONTHS = 12
+DAYS_PER_MONTH = 365.25 / 12
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _lote_text(lotes: pd.Series) -> pd.Series:
+    # read_csv lee los lotes numéricos como float (837200802.0) cuando hay vacíos.
+    if pd.api.types.is_float_dtype(lotes):
+        lotes = lotes.astype("Int64")
+    return lotes.astype("string").str.strip().replace("", pd.NA)
+
+
+def _cpma_recent(tformdet_orig: pd.DataFrame) -> pd.Series:
+    """CPMA por CODIGO_MED sobre los últimos CPMA_MONTHS meses con datos."""
+    monthly = prepare_monthly_consumption(tformdet_orig)
+    months = np.sort(monthly["ANNOMES"].unique())[-CPMA_MONTHS:]
+    recent = monthly[monthly["ANNOMES"].isin(months)]
+    return recent.groupby("CODIGO_MED")["TOTAL_CONSUMO"].sum() / max(len(months), 1)
+
+
+@dataclass
+class ExpiryIndex:
+    """Lotes con stock de la última foto de tformdet y su consumo proyectado.
+
+    `lots` está ordenado por (CODIGO_MED, FEC_EXP), el orden FEFO en que se
+    consumen los lotes de un producto, y ya trae CONSUMO_ESTIMADO y
+    STOCK_EN_RIESGO: ambos dependen solo de la foto, no de la fecha consultada.
+    `by_expiry` ordena las posiciones de `lots` por FEC_EXP, de modo que "vence
+    entre A y B" es un searchsorted sobre `expiry_sorted` en vez de recorrer
+    todos los lotes.
+    """
+
+    lots: pd.DataFrame
+    snapshot: int | None  # ANNOMES de la foto
+    expiry_days: np.ndarray  # FEC_EXP en días desde 1970, orden de `lots`
+    by_expiry: np.ndarray
+    expiry_sorted: np.ndarray
+
+    def expiring(self, start: int, end: int) -> np.ndarray:
+        """Posiciones en `lots` de los lotes con FEC_EXP en [start, end] (días)."""
+        lo = np.searchsorted(self.expiry_sorted, start, side="left")
+        hi = np.searchsorted(self.expiry_sorted, end, side="right")
+        return self.by_expiry[lo:hi]
+
+
+def _snapshot_day(annomes: int) -> int:
+    """Día siguiente al cierre del mes ANNOMES (STOCK_FIN es el stock a fin de mes)."""
+    year, month = divmod(annomes, 100)
+    return _day(date(year + month // 12, month % 12 + 1, 1))
+
+
+def project_fefo(
+    product_rank: np.ndarray,
+    stock: np.ndarray,
+    consumible: np.ndarray,
+) -> np.ndarray:
+    """Stock de cada lote que vence sin consumirse, con consumo FEFO.
+
+    Los lotes van ordenados por (producto, vencimiento); `consumible` es lo que
+    el producto consume desde la foto hasta el vencimiento de cada lote. Con P
+    el stock acumulado del producto hasta el lote incluido, lo consumido de sus
+    lotes hasta el vencimiento del lote i es T_i = P_i + min(0, min_k<=i(C_k - P_k)):
+    el consumo queda limitado por el stock o por lo que perdieron los lotes ya
+    vencidos. Lo que vence sin consumirse del lote i es s_i - (T_i - T_i-1).
+    """
+    if not len(stock):
+        return np.zeros(0)
+    starts = np.r_[True, product_rank[1:] != product_rank[:-1]]
+    cumulative = np.cumsum(stock)
+    first = np.flatnonzero(starts)
+    offset = np.repeat(
+        cumulative[first] - stock[first], np.diff(np.r_[first, len(stock)])
+    )
+    shortfall = (
+        pd.Series(consumible - (cumulative - offset))
+        .groupby(product_rank)
+        .cummin()
+        .clip(upper=0.0)
+        .to_numpy()
+    )
+    previous = np.where(starts, 0.0, np.r_[0.0, shortfall[:-1]])
+    return previous - shortfall
+
+
+@register_index("expiry", TFORMDET_CSV)
+def build_expiry_index(tformdet_orig: pd.DataFrame) -> ExpiryIndex:
+    # Sin la fila de totales del mes (`lot_stock`): su stock ya está en los lotes.
+    snapshot = current_snapshot(prepare_consumption(tformdet_orig))
+    tformdet = snapshot[
+        ["CODIGO_MED", "ANNOMES", "PRECIO", "STOCK_FIN", "FEC_EXP", "MEDLOTE"]
+    ].copy()
+    tformdet["FEC_EXP"] = pd.to_datetime(tformdet["FEC_EXP"], format="%Y-%m-%d")
+    # FEC_EXP es opcional en el esquema: los lotes sin vencimiento no entran.
+    tformdet = tformdet[tformdet["FEC_EXP"].notna() & (tformdet["STOCK_FIN"] > 0)]
+    tformdet["MEDLOTE"] = _lote_text(tformdet["MEDLOTE"])
+
+    lots = (
+        tformdet.groupby(["CODIGO_MED", "FEC_EXP", "MEDLOTE"], dropna=False, sort=True)
+        .agg(
+            STOCK_LOTE=("STOCK_FIN", "sum"),
+            PRECIO=("PRECIO", "last"),
+            ANNOMES=("ANNOMES", "max"),
+        )
+        .reset_index()
+    )
+    lots["ANNOMES"] = lots["ANNOMES"].astype(int)
+    lots["CPMA"] = (
+        lots["CODIGO_MED"].map(_cpma_recent(tformdet_orig)).fillna(0.0).to_numpy()
+    )
+
+    expiry_days = (lots["FEC_EXP"].to_numpy().astype("datetime64[D]") - _EPOCH).astype(
+        np.int64
+    )
+    annomes = int(snapshot["ANNOMES"].max()) if len(snapshot) else None
+    stock = lots["STOCK_LOTE"].to_numpy(dtype=float)
+    if annomes is None:
+        consumible = np.zeros(len(lots))
+    else:
+        days = np.maximum(expiry_days - _snapshot_day(annomes), 0)
+        consumible = lots["CPMA"].to_numpy(dtype=float) * days / DAYS_PER_MONTH
+    product_rank = pd.factorize(lots["CODIGO_MED"], sort=True)[0]
+    at_risk = project_fefo(product_rank, stock, consumible)
+
+    # Stock de los lotes del producto que se consumen antes (FEFO) en la foto.
+    cumulative = lots.groupby("CODIGO_MED")["STOCK_LOTE"].cumsum()
+    lots["STOCK_PREVIO"] = (cumulative - lots["STOCK_LOTE"]).to_numpy(dtype=float)
+    lots["CONSUMO_ESTIMADO"] = stock - at_risk
+    lots["STOCK_EN_RIESGO"] = at_risk
+    lots["VALOR_EN_RIESGO"] = at_risk * lots["PRECIO"]
+    lots["RIESGO"] = at_risk > 0
+
+    by_expiry = np.argsort(expiry_days, kind="stable")
+    return ExpiryIndex(
+        lots=lots,
+        snapshot=annomes,
+        expiry_days=expiry_days,
+        by_expiry=by_expiry,
+        expiry_sorted=expiry_days[by_expiry],
+    )
+
+
+def _day(value: date) -> int:
+    return int((np.datetime64(value, "D") - _EPOCH).astype(np.int64))
+
+
+def build_expiry_risk(
+    index: ExpiryIndex,
+    mproducto_orig: pd.DataFrame,
+    as_of: date,
+    days: int,
+    product_type_list: list[str] | None = None,
+    strategy_list: list[str] | None = None,
+    only_at_risk: bool = False,
+) -> dict[str, Any]:
+    """Lotes que vencen en los próximos `days` días desde `as_of` y su stock en riesgo.
+
+    El consumo se proyecta desde la última foto de tformdet (fin de su mes) con
+    el CPMA de cada producto y consumo FEFO (primero los lotes que vencen antes):
+    CONSUMO_ESTIMADO es lo que se consume de cada lote antes de su vencimiento y
+    STOCK_EN_RIESGO lo que quedaría sin consumir.
+    """
+    product_type_list = product_type_list or []
+    strategy_list = strategy_list or []
+    today = _day(as_of)
+
+    positions = index.expiring(today, today + days)
+    result = index.lots.iloc[positions]
+    mproducto_unique = filter_products(mproducto_orig, product_type_list, strategy_list)
+    if product_type_list or strategy_list:
+        keep = result["CODIGO_MED"].isin(mproducto_unique["MEDCOD"]).to_numpy()
+        positions, result = positions[keep], result[keep]
+
+    result = result.copy()
+    result.insert(
+        result.columns.get_loc("STOCK_PREVIO"),
+        "DIAS_PARA_VENCER",
+        index.expiry_days[positions] - today,
+    )
+    if only_at_risk:
+        result = result[result["RIESGO"]]
+
+    attr_cols = [col for col in MPRODUCTO_COLS[1:] if col in mproducto_unique.columns]
+    result = result.merge(
+        mproducto_unique[["MEDCOD"] + attr_cols],
+        left_on="CODIGO_MED",
+        right_on="MEDCOD",
+        how="left",
+    ).drop(columns=["MEDCOD"])
+    for col in DESCRIPTIVE_TEXT_COLS:
+        if col in result.columns:
+            result[col] = result[col].fillna("Desconocido")
+
+    result["FEC_EXP"] = result["FEC_EXP"].dt.strftime("%Y-%m-%d")
+    return {
+        "count": len(result),
+        "as_of": as_of.isoformat(),
+        "days": days,
+        "snapshot": str(index.snapshot) if index.snapshot is not None else None,
+        "lots_at_risk": int(result["RIESGO"].sum()),
+        "stock_at_risk": float(result["STOCK_EN_RIESGO"].sum()),
+        "data": json.loads(result.to_json(orient="records")),
+    }
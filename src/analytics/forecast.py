@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.datasets import MPRODUCTO_CSV, TFORMDET_CSV, register_index
+from src.analytics.summary import prepare_monthly_consumption
+
+# Meses pronosticados a partir del último ANNOMES de tformdet.
+FORECAST_HORIZON = 6
+# Alfas candidatas del suavizado exponencial; cada serie usa la de menor error.
+ALPHAS = np.linspace(0.1, 0.9, 9)
+
+LEVELS = ("total", "medtip", "medest", "product")
+UNKNOWN = "Desconocido"
+
+
+@dataclass
+class HierarchicalForecast:
+    """Pronósticos conciliados de todas las series de la jerarquía.
+
+    Las filas de `reconciled` y `base` siguen el orden de `keys` (nivel, clave):
+    total, cada MEDTIP, cada MEDEST y cada producto. Por construcción cada
+    agregado de `reconciled` es la suma de sus productos.
+    """
+
+    months: list[int]
+    keys: pd.MultiIndex
+    base: np.ndarray
+    reconciled: np.ndarray
+
+    def level(self, level: str, keys: list[Any] | None = None) -> pd.DataFrame:
+        rows = self.keys.get_level_values("level") == level
+        frame = pd.DataFrame(
+            self.reconciled[rows],
+            index=self.keys[rows].get_level_values("key"),
+            columns=self.months,
+        )
+        if keys:
+            frame = frame[frame.index.isin(keys)]
+        return frame
+
+    def next_month(self) -> pd.Series:
+        """Pronóstico conciliado del primer mes del horizonte por CODIGO_MED."""
+        return self.level("product")[self.months[0]]
+
+
+def _month_range(first: int, last: int, extra: int = 0) -> list[int]:
+    periods = pd.period_range(
+        pd.Period(str(first), freq="M"), pd.Period(str(last), freq="M") + extra
+    )
+    return [int(p.strftime("%Y%m")) for p in periods]
+
+
+def exponential_smoothing(history: np.ndarray) -> np.ndarray:
+    """Nivel final del suavizado exponencial simple de cada fila de `history`.
+
+    Todas las series y todas las alfas de ALPHAS se evalúan a la vez; cada serie
+    se queda con la alfa de menor error cuadrático a un paso.
+    """
+    history = np.asarray(history, dtype=float)  # consumos enteros incluidos
+    level = np.repeat(history[:, :1], len(ALPHAS), axis=1)  # series x alfas
+    sse = np.zeros_like(level)
+    for t in range(1, history.shape[1]):
+        error = history[:, t : t + 1] - level
+        sse += error**2
+        level += ALPHAS * error
+    best = sse.argmin(axis=1)
+    return level[np.arange(len(history)), best]
+
+
+def reconcile(
+    bottom: np.ndarray, aggregates: np.ndarray, membership: np.ndarray
+) -> np.ndarray:
+    """Conciliación WLS estructural de pronósticos base, para todo el horizonte.
+
+    `membership` (agregados x productos, 0/1) es la parte de agregación de la
+    matriz S = [membership; I]. Con W = diag(productos por serie), la solución
+    (S' W⁻¹ S)⁻¹ S' W⁻¹ ŷ se calcula con la identidad de Woodbury, que solo
+    invierte una matriz agregados x agregados en lugar de productos x productos.
+    Devuelve los pronósticos conciliados de los productos.
+    """
+    sizes = membership.sum(axis=1)
+    rhs = bottom + membership.T @ (aggregates / sizes[:, None])
+    inner = np.diag(sizes) + membership @ membership.T
+    return rhs - membership.T @ np.linalg.solve(inner, membership @ rhs)
+
+
+@register_index("forecast", TFORMDET_CSV, MPRODUCTO_CSV)
+def build_forecast(
+    tformdet_orig: pd.DataFrame, mproducto_orig: pd.DataFrame
+) -> HierarchicalForecast:
+    monthly = prepare_monthly_consumption(tformdet_orig)
+    months = _month_range(monthly["ANNOMES"].min(), monthly["ANNOMES"].max())
+    history = (
+        monthly.pivot(index="CODIGO_MED", columns="ANNOMES", values="TOTAL_CONSUMO")
+        .reindex(columns=months)
+        .fillna(0.0)
+    )
+    products = history.index
+
+    attributes = (
+        mproducto_orig.drop_duplicates(subset=["MEDCOD"])
+        .set_index("MEDCOD")[["MEDTIP", "MEDEST"]]
+        .reindex(products)
+        .fillna(UNKNOWN)
+        .astype(str)
+    )
+    medtip = pd.get_dummies(attributes["MEDTIP"]).T.sort_index()
+    medest = pd.get_dummies(attributes["MEDEST"]).T.sort_index()
+    membership = np.vstack(
+        [np.ones((1, len(products))), medtip.to_numpy(), medest.to_numpy()]
+    ).astype(float)
+
+    # Pronósticos base independientes por serie: cada agregado con su propia
+    # historia, por eso no suman lo mismo que sus productos.
+    bottom_history = history.to_numpy()
+    bottom_base = exponential_smoothing(bottom_history)
+    aggregate_base = exponential_smoothing(membership @ bottom_history)
+
+    horizon = _month_range(months[-1], months[-1], FORECAST_HORIZON)[1:]
+    bottom_base = np.repeat(bottom_base[:, None], FORECAST_HORIZON, axis=1)
+    aggregate_base = np.repeat(aggregate_base[:, None], FORECAST_HORIZON, axis=1)
+
+    bottom = reconcile(bottom_base, aggregate_base, membership)
+    # Sin consumos negativos; se vuelve a agregar para mantener la coherencia.
+    bottom = np.clip(bottom, 0.0, None)
+
+    keys = pd.MultiIndex.from_tuples(
+        [("total", "total")]
+        + [("medtip", key) for key in medtip.index]
+        + [("medest", key) for key in medest.index]
+        + [("product", key) for key in products],
+        names=["level", "key"],
+    )
+    return HierarchicalForecast(
+        months=horizon,
+        keys=keys,
+        base=np.vstack([aggregate_base, bottom_base]),
+        reconciled=np.vstack([membership @ bottom, bottom]),
+    )
+
+
+def build_forecast_response(
+    forecast: HierarchicalForecast,
+    level: str,
+    keys: list[Any] | None = None,
+    horizon: int = FORECAST_HORIZON,
+) -> dict[str, Any]:
+    months = forecast.months[:horizon]
+    rows = forecast.keys.get_level_values("level") == level
+    frame = forecast.level(level, keys)[months]
+    base = pd.DataFrame(
+        forecast.base[rows], index=forecast.keys[rows].get_level_values("key")
+    ).loc[frame.index, : horizon - 1]
+    data = [
+        {"key": key, "forecast": values, "base": base_values}
+        for key, values, base_values in zip(
+            frame.index.tolist(), frame.to_numpy().tolist(), base.to_numpy().tolist()
+        )
+    ]
+    return {
+        "level": level,
+        "months": [str(month) for month in months],
+        "count": len(data),
+        "data": data,
+    }
@@ -0,0 +1,57 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Sequence
+
+from src.config import settings
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_pool() -> ProcessPoolExecutor | None:
+    """Pool de procesos del worker, creado al primer uso (None si está desactivado)."""
+    global _pool
+    if settings.ANALYTICS_WORKERS <= 1:
+        return None
+    if _pool is None:
+        # spawn y no fork: el worker ya tiene hilos (event loop, warm-up) al crearlo.
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.ANALYTICS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+async def map_partitions(
+    func: Callable[..., Any], partitions: Sequence[tuple]
+) -> list[Any]:
+    """`func(*args)` de cada partición, en el pool cuando hay más de una.
+
+    `func` y sus argumentos deben poder serializarse con pickle; los resultados
+    conservan el orden de las particiones.
+    """
+    pool = get_pool()
+    if pool is None or len(partitions) <= 1:
+        return [func(*args) for args in partitions]
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        *(loop.run_in_executor(pool, func, *args) for args in partitions)
+    )
+
+
+def _import_analytics(_: int) -> None:
+    import src.analytics.warehouses  # noqa: F401
+
+
+def prestart() -> None:
+    """Arranca el pool e importa en cada proceso los módulos de análisis (bloquea)."""
+    pool = get_pool()
+    if pool is not None:
+        list(pool.map(_import_analytics, range(settings.ANALYTICS_WORKERS)))
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
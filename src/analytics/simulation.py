@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.bulk import ProductStatus
+from src.analytics.summary import (
+    SITUACIONES,
+    SOBRESTOCK_MONTHS,
+    SUBSTOCK_MONTHS,
+    check_thresholds,
+    filter_products,
+    situacion_codes,
+)
+
+SUBSTOCK = int(np.flatnonzero(SITUACIONES == "Substock")[0])
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """Umbrales de SITUACION en meses de cobertura y, opcionalmente, reposición.
+
+    Con `reorder_months`, cada producto en Substock se repone hasta cubrir esa
+    cantidad de meses de su CPMA.
+    """
+
+    sobrestock: float = SOBRESTOCK_MONTHS
+    substock: float = SUBSTOCK_MONTHS
+    reorder_months: float | None = None
+
+    def __post_init__(self) -> None:
+        check_thresholds(self.sobrestock, self.substock)
+        if self.reorder_months is not None and self.reorder_months <= 0:
+            raise ValueError(
+                f"reorder_months inválido: {self.reorder_months}. Debe ser mayor que 0."
+            )
+
+
+def _distribution(codes: np.ndarray) -> np.ndarray:
+    """Productos por SITUACION de cada fila (escenario) de `codes`."""
+    offsets = np.arange(len(codes))[:, None] * len(SITUACIONES)
+    counts = np.bincount(
+        (codes + offsets).ravel(), minlength=len(codes) * len(SITUACIONES)
+    )
+    return counts.reshape(len(codes), len(SITUACIONES))
+
+
+def _as_dict(counts: np.ndarray) -> dict[str, int]:
+    return {str(label): int(count) for label, count in zip(SITUACIONES, counts)}
+
+
+def simulate(
+    status: ProductStatus,
+    mproducto_orig: pd.DataFrame,
+    scenarios: list[Scenario],
+    real_time: bool = False,
+    product_type_list: list[str] | None = None,
+    strategy_list: list[str] | None = None,
+) -> dict[str, Any]:
+    """Distribución de SITUACION de todo el catálogo bajo cada escenario.
+
+    Parte del estado actual de cada producto (índice "product_status") y evalúa
+    todos los escenarios a la vez: los umbrales son columnas (escenarios x 1) que
+    se combinan por broadcasting con CPMA y STOCK_FIN (1 x productos).
+    """
+    product_type_list = product_type_list or []
+    strategy_list = strategy_list or []
+
+    keep = np.ones(len(status.codes), dtype=bool)
+    if product_type_list or strategy_list:
+        mproducto_unique = filter_products(
+            mproducto_orig, product_type_list, strategy_list
+        )
+        keep = np.isin(status.codes, mproducto_unique["MEDCOD"].to_numpy())
+    cpma = status.cpma[keep]
+    stock_fin = (status.stock_real if real_time else status.stock_fin)[keep]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        niveles = stock_fin / cpma
+    niveles = np.where(np.isfinite(niveles), niveles, 0.0)
+
+    sobrestock = np.array([s.sobrestock for s in scenarios], dtype=float)[:, None]
+    substock = np.array([s.substock for s in scenarios], dtype=float)[:, None]
+    reorder_months = np.array(
+        [np.nan if s.reorder_months is None else s.reorder_months for s in scenarios],
+        dtype=float,
+    )[:, None]
+
+    codes = situacion_codes(niveles, cpma, stock_fin, sobrestock, substock)
+
+    # Reposición hasta reorder_months de cobertura de los productos en Substock
+    # (tienen CPMA > 0); los escenarios sin reposición quedan en NaN y no piden.
+    with np.errstate(invalid="ignore"):
+        quantity = np.where(
+            (codes == SUBSTOCK) & ~np.isnan(reorder_months),
+            np.ceil(np.maximum(reorder_months * cpma - stock_fin, 0.0)),
+            0.0,
+        )
+    stock_after = stock_fin + quantity
+    with np.errstate(divide="ignore", invalid="ignore"):
+        niveles_after = np.where(quantity > 0, stock_after / cpma, niveles)
+    codes_after = situacion_codes(
+        niveles_after, cpma, stock_after, sobrestock, substock
+    )
+
+    before = _distribution(codes)
+    after = _distribution(codes_after)
+    reordered = (quantity > 0).sum(axis=1)
+    total = quantity.sum(axis=1)
+
+    results = []
+    for i, scenario in enumerate(scenarios):
+        result = {
+            "sobrestock": scenario.sobrestock,
+            "substock": scenario.substock,
+            "reorder_months": scenario.reorder_months,
+            "situacion": _as_dict(before[i]),
+            "reorder": None,
+        }
+        if scenario.reorder_months is not None:
+            result["reorder"] = {
+                "products": int(reordered[i]),
+                "quantity": float(total[i]),
+                "situacion": _as_dict(after[i]),
+            }
+        results.append(result)
+
+    return {
+        "count": int(keep.sum()),
+        "cpma_months": [str(status.months[0]), str(status.months[-1])]
+        if status.months
+        else [],
+        "scenarios": results,
+    }
@@ -0,0 +1,546 @@
+import json
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.datasets import TFORMDET_CSV, register_index
+from src.analytics.timing import StageTimer
+
+MPRODUCTO_COLS = [
+    "MEDCOD",
+    "MEDNOM",
+    "MEDPRES",
+    "MEDCNC",
+    "MEDTIP",
+    "MEDPET",
+    "MEDFF",
+    "MEDEST",
+]
+DESCRIPTIVE_TEXT_COLS = [
+    "MEDNOM",
+    "MEDPRES",
+    "MEDCNC",
+    "MEDTIP",
+    "MEDPET",
+    "MEDFF",
+    "MEDEST",
+]
+CONSUMO_COLS = ["VENTA", "SIS", "INTERSAN"]
+METRIC_COLS = ["CPMA", "CONSUMO_MEN", "STOCK_FIN", "NIVELES", "SITUACION"]
+
+# Umbrales de SITUACION en meses de cobertura (NIVELES).
+SOBRESTOCK_MONTHS = 7
+SUBSTOCK_MONTHS = 1
+# Valores de SITUACION en el orden de `situacion_codes`.
+SITUACIONES = np.array(
+    [
+        "Sobrestock (Sin Consumo)",
+        "Normostock (Sin Movimiento)",
+        "Sobrestock",
+        "Substock",
+        "Normostock",
+    ]
+)
+
+
+def split_multi_values(values: list[str] | None) -> list[str]:
+    """Aplana ?param=A&param=B y ?param=A,B,C en una lista de valores únicos."""
+    result = []
+    if values:
+        for item in values:
+            result.extend([v.strip() for v in item.split(",") if v.strip()])
+        result = list(set(v for v in result if v))
+    return result
+
+
+def empty_summary(anomes: int = 0) -> dict[str, Any]:
+    return {"count": 0, "data_count": 0, "anomes": anomes, "months": [], "data": []}
+
+
+def check_thresholds(sobrestock: float, substock: float) -> None:
+    """ValueError si no se cumple 0 <= substock <= sobrestock (meses de cobertura)."""
+    if substock < 0 or sobrestock < substock:
+        raise ValueError(
+            f"Umbrales inválidos: substock={substock}, sobrestock={sobrestock}. "
+            "Debe cumplirse 0 <= substock <= sobrestock."
+        )
+
+
+def situacion(
+    nivel,
+    cpma,
+    stock_fin,
+    sobrestock=SOBRESTOCK_MONTHS,
+    substock=SUBSTOCK_MONTHS,
+):
+    """SITUACION de un solo producto; la regla es la de `situacion_codes`."""
+    if pd.isna(nivel):
+        return "Indeterminado"
+    return str(
+        SITUACIONES[
+            situacion_codes(
+                np.float64(nivel),
+                np.float64(cpma),
+                np.float64(stock_fin),
+                sobrestock,
+                substock,
+            )
+        ]
+    )
+
+
+def situacion_codes(
+    niveles: np.ndarray,
+    cpma: np.ndarray,
+    stock_fin: np.ndarray,
+    sobrestock: float | np.ndarray = SOBRESTOCK_MONTHS,
+    substock: float | np.ndarray = SUBSTOCK_MONTHS,
+) -> np.ndarray:
+    """`situacion` vectorizada: posición en SITUACIONES (NIVELES ya sin NaN).
+
+    Los argumentos se combinan con broadcasting, así que con umbrales de forma
+    (escenarios, 1) y métricas por producto se evalúan todos los escenarios a la vez.
+    """
+    sin_consumo = cpma == 0
+    return np.select(
+        [
+            sin_consumo & (stock_fin > 0),
+            sin_consumo,
+            niveles > sobrestock,
+            niveles < substock,
+        ],
+        [0, 1, 2, 3],
+        default=4,
+    )
+
+
+def situacion_array(
+    niveles: np.ndarray,
+    cpma: np.ndarray,
+    stock_fin: np.ndarray,
+    sobrestock: float | np.ndarray = SOBRESTOCK_MONTHS,
+    substock: float | np.ndarray = SUBSTOCK_MONTHS,
+) -> np.ndarray:
+    """`situacion` vectorizada sobre arrays (NIVELES ya sin NaN)."""
+    return SITUACIONES[situacion_codes(niveles, cpma, stock_fin, sobrestock, substock)]
+
+
+def filter_products(
+    mproducto_orig: pd.DataFrame, product_type_list: list[str], strategy_list: list[str]
+) -> pd.DataFrame:
+    mproducto = mproducto_orig.copy()
+    if product_type_list:
+        mproducto = mproducto[mproducto["MEDTIP"].astype(str).isin(product_type_list)]
+    if strategy_list:
+        mproducto = mproducto[mproducto["MEDEST"].astype(str).isin(strategy_list)]
+
+    # Asegurarse que las columnas existan en mproducto antes de seleccionar
+    mproducto_cols_existentes = [
+        col for col in MPRODUCTO_COLS if col in mproducto.columns
+    ]
+    return mproducto[mproducto_cols_existentes].drop_duplicates(subset=["MEDCOD"])
+
+
+def lot_stock(tformdet: pd.DataFrame) -> pd.Series:
+    """STOCK_FIN de cada fila sin contar dos veces el stock de un mes.
+
+    Algunos meses traen, además de las filas por lote, una fila sin MEDLOTE con
+    el total del producto (la suma de sus lotes). Su stock pasa a 0 cuando el
+    producto tiene lotes ese mes; su consumo (VENTA, SIS, INTERSAN) sí cuenta,
+    porque las filas por lote no lo traen.
+    """
+    if "MEDLOTE" not in tformdet.columns:
+        return tformdet["STOCK_FIN"]
+    sin_lote = tformdet["MEDLOTE"].isna() | tformdet["MEDLOTE"].astype(
+        str
+    ).str.strip().eq("")
+    con_lotes = (
+        (~sin_lote)
+        .groupby([tformdet["CODIGO_MED"], tformdet["ANNOMES"]])
+        .transform("any")
+    )
+    return tformdet["STOCK_FIN"].where(~(sin_lote & con_lotes), 0)
+
+
+@register_index("consumption", TFORMDET_CSV)
+def prepare_consumption(tformdet_orig: pd.DataFrame) -> pd.DataFrame:
+    """tformdet con ANNOMES entero y STOCK_FIN por lote (`lot_stock`), calculado
+    una vez por versión del CSV.
+
+    Columnas, tipos y rangos ya se validan en la ingesta (src.data.validation).
+    """
+    tformdet = tformdet_orig.copy()
+    tformdet["ANNOMES"] = tformdet["ANNOMES"].astype(int)
+    tformdet["STOCK_FIN"] = lot_stock(tformdet)
+    return tformdet
+
+
+@register_index("monthly_consumption", TFORMDET_CSV)
+def prepare_monthly_consumption(tformdet_orig: pd.DataFrame) -> pd.DataFrame:
+    """Una fila por (CODIGO_MED, ANNOMES), ordenada, con TOTAL_CONSUMO y STOCK_FIN.
+
+    tformdet trae una fila por lote (FEC_EXP/MEDLOTE), así que el STOCK_FIN del mes
+    es la suma de los lotes.
+    """
+    tformdet = add_total_consumo(prepare_consumption(tformdet_orig))
+    return (
+        tformdet.groupby(["CODIGO_MED", "ANNOMES"], sort=True)
+        .agg(TOTAL_CONSUMO=("TOTAL_CONSUMO", "sum"), STOCK_FIN=("STOCK_FIN", "sum"))
+        .reset_index()
+    )
+
+
+def current_warehouse_stock(mstockalm: pd.DataFrame) -> pd.DataFrame:
+    """Filas vigentes de mstockalm: la de STKFECHULT más reciente por almacén y
+    producto.
+
+    mstockalm.csv apila las exportaciones de cada año; las filas anteriores de
+    un (ALMCOD, MEDCOD) son versiones viejas de su saldo, no stock adicional.
+    """
+    if mstockalm.empty or "STKFECHULT" not in mstockalm.columns:
+        return mstockalm
+    updated = pd.to_datetime(mstockalm["STKFECHULT"], errors="coerce", format="ISO8601")
+    order = updated.reset_index(drop=True).sort_values(
+        kind="stable", na_position="first"
+    )
+    return mstockalm.iloc[order.index].drop_duplicates(
+        subset=["ALMCOD", "MEDCOD"], keep="last"
+    )
+
+
+def current_snapshot(tformdet: pd.DataFrame) -> pd.DataFrame:
+    """Filas del último ANNOMES de tformdet: el stock vigente de todo el catálogo.
+
+    Un producto que no aparece en ese mes ya no tiene stock informado y no entra,
+    aunque meses antes sí lo tuviera.
+    """
+    return tformdet[tformdet["ANNOMES"] == tformdet["ANNOMES"].max()]
+
+
+def filter_consumption(
+    consumption: pd.DataFrame, start_date: int, end_date: int
+) -> pd.DataFrame:
+    mask = (consumption["ANNOMES"] >= start_date) & (consumption["ANNOMES"] <= end_date)
+    return consumption[mask].copy()
+
+
+def add_total_consumo(tformdet: pd.DataFrame) -> pd.DataFrame:
+    # Los consumos son opcionales en el esquema: vacío cuenta como 0.
+    tformdet[CONSUMO_COLS] = tformdet[CONSUMO_COLS].fillna(0)
+    tformdet["TOTAL_CONSUMO"] = tformdet[CONSUMO_COLS].sum(axis=1)
+    return tformdet
+
+
+def pivot_consumption(tformdet: pd.DataFrame) -> tuple[pd.DataFrame, list]:
+    """Tabla mensual CODIGO_MED x ANNOMES con CPMA y CONSUMO_MEN."""
+    if tformdet.empty or "CODIGO_MED" not in tformdet.columns:
+        consumo_pivot = pd.DataFrame()  # Vacío, se manejará más adelante
+    else:
+        consumo_mensual = (
+            tformdet.groupby(["CODIGO_MED", "ANNOMES"])["TOTAL_CONSUMO"]
+            .sum()
+            .reset_index()
+        )
+        if consumo_mensual.empty:
+            consumo_pivot = pd.DataFrame()
+        else:
+            consumo_pivot = consumo_mensual.pivot(
+                index="CODIGO_MED", columns="ANNOMES", values="TOTAL_CONSUMO"
+            ).fillna(0)
+
+    # Las columnas de meses en consumo_pivot SON numéricas (ej. 202401, 202402)
+    month_columns_numeric = [
+        col
+        for col in consumo_pivot.columns
+        if isinstance(col, (int, np.integer, float, np.floating))
+    ]
+
+    if consumo_pivot.empty or not month_columns_numeric:
+        # Si consumo_pivot está vacío, creamos las columnas CPMA y CONSUMO_MEN
+        # en un DF vacío con índice CODIGO_MED (hubo productos sin datos pivoteables)
+        if consumo_pivot.empty and "CODIGO_MED" in tformdet.columns:
+            unique_codigos_med = tformdet["CODIGO_MED"].unique()
+            consumo_pivot = pd.DataFrame(
+                index=pd.Index(unique_codigos_med, name="CODIGO_MED")
+            )
+
+        consumo_pivot["CPMA"] = 0.0
+        consumo_pivot["CONSUMO_MEN"] = 0
+    else:
+        consumo_pivot["CPMA"] = consumo_pivot[month_columns_numeric].mean(axis=1)
+        consumo_pivot["CONSUMO_MEN"] = (consumo_pivot[month_columns_numeric] > 0).sum(
+            axis=1
+        )
+
+    if (
+        "CODIGO_MED" not in consumo_pivot.index.names
+        and "CODIGO_MED" not in consumo_pivot.columns
+    ):
+        # Si CODIGO_MED no es índice ni columna (caso de consumo_pivot totalmente vacío)
+        # los merges posteriores darán resultados vacíos, lo cual es manejable.
+        consumo_pivot = consumo_pivot.reset_index(drop=True)
+    else:
+        consumo_pivot = consumo_pivot.reset_index()
+
+    return consumo_pivot, month_columns_numeric
+
+
+def merge_stock(
+    consumo_pivot: pd.DataFrame,
+    tformdet: pd.DataFrame,
+    mstockalm_orig: pd.DataFrame,
+    real_time: bool,
+) -> pd.DataFrame:
+    if real_time:
+        stock_df = current_warehouse_stock(mstockalm_orig)
+        if (
+            not stock_df.empty
+            and "MEDCOD" in stock_df.columns
+            and "STKSALDO" in stock_df.columns
+        ):
+            stock_to_use = stock_df.groupby("MEDCOD", as_index=False)["STKSALDO"].sum()
+            stock_to_use = stock_to_use.rename(
+                columns={"MEDCOD": "CODIGO_MED", "STKSALDO": "STOCK_FIN"}
+            )
+            if "CODIGO_MED" in consumo_pivot.columns:
+                consumo_pivot = consumo_pivot.merge(
+                    stock_to_use, on="CODIGO_MED", how="left"
+                )
+            else:  # consumo_pivot podría estar vacío o sin CODIGO_MED
+                consumo_pivot["STOCK_FIN"] = pd.NA
+        else:
+            consumo_pivot["STOCK_FIN"] = pd.NA
+    else:
+        if (
+            not tformdet.empty
+            and "CODIGO_MED" in tformdet.columns
+            and "STOCK_FIN" in tformdet.columns
+        ):
+            # Como en prepare_monthly_consumption: el STOCK_FIN de un mes es la
+            # suma de sus lotes y el del producto es el de su último mes.
+            latest_stock_fin_in_period = (
+                tformdet.groupby(["CODIGO_MED", "ANNOMES"], sort=True)["STOCK_FIN"]
+                .sum()
+                .groupby(level="CODIGO_MED")
+                .last()
+                .reset_index()
+            )
+            if "CODIGO_MED" in consumo_pivot.columns:
+                consumo_pivot = consumo_pivot.merge(
+                    latest_stock_fin_in_period, on="CODIGO_MED", how="left"
+                )
+            else:
+                consumo_pivot["STOCK_FIN"] = pd.NA
+        else:
+            consumo_pivot["STOCK_FIN"] = pd.NA
+
+    if "STOCK_FIN" not in consumo_pivot.columns:
+        consumo_pivot["STOCK_FIN"] = pd.NA
+    consumo_pivot["STOCK_FIN"] = pd.to_numeric(
+        consumo_pivot["STOCK_FIN"], errors="coerce"
+    ).fillna(0.0)
+    return consumo_pivot
+
+
+def classify(
+    consumo_pivot: pd.DataFrame,
+    sobrestock: float = SOBRESTOCK_MONTHS,
+    substock: float = SUBSTOCK_MONTHS,
+) -> pd.DataFrame:
+    """Calcula NIVELES (meses de cobertura) y SITUACION."""
+    if "CPMA" not in consumo_pivot.columns:
+        consumo_pivot["CPMA"] = 0.0
+    consumo_pivot["CPMA"] = pd.to_numeric(
+        consumo_pivot["CPMA"], errors="coerce"
+    ).fillna(0.0)
+
+    consumo_pivot["NIVELES"] = consumo_pivot["STOCK_FIN"] / consumo_pivot["CPMA"]
+    consumo_pivot["NIVELES"] = consumo_pivot["NIVELES"].replace(
+        [np.inf, -np.inf], np.nan
+    )
+    consumo_pivot["NIVELES"] = consumo_pivot["NIVELES"].fillna(0.0)
+
+    if not consumo_pivot.empty:
+        consumo_pivot["SITUACION"] = situacion_array(
+            consumo_pivot["NIVELES"].to_numpy(dtype=float),
+            consumo_pivot["CPMA"].to_numpy(dtype=float),
+            consumo_pivot["STOCK_FIN"].to_numpy(dtype=float),
+            sobrestock,
+            substock,
+        ).astype(object)
+    else:
+        consumo_pivot["SITUACION"] = None
+    return consumo_pivot
+
+
+def merge_products(
+    consumo_pivot: pd.DataFrame, mproducto_unique: pd.DataFrame
+) -> pd.DataFrame:
+    if (
+        not consumo_pivot.empty
+        and "CODIGO_MED" in consumo_pivot.columns
+        and not mproducto_unique.empty
+        and "MEDCOD" in mproducto_unique.columns
+    ):
+        consumo_pivot = consumo_pivot.merge(
+            mproducto_unique,
+            left_on="CODIGO_MED",
+            right_on="MEDCOD",
+            how="left",
+            suffixes=("", "_mprod"),
+        )
+        if "MEDCOD_mprod" in consumo_pivot.columns:
+            consumo_pivot = consumo_pivot.drop(columns=["MEDCOD_mprod"])
+    else:
+        # Si no se puede hacer el merge, las columnas de mproducto existen con Nones
+        # (MEDCOD ya es CODIGO_MED)
+        for col in MPRODUCTO_COLS:
+            if col != "MEDCOD" and col not in consumo_pivot.columns:
+                consumo_pivot[col] = None
+    return consumo_pivot
+
+
+def finalize(
+    consumo_pivot: pd.DataFrame, month_columns_numeric: list
+) -> tuple[pd.DataFrame, list[str]]:
+    """Ordena columnas y convierte los meses a string para la salida JSON."""
+    months_for_output = sorted([str(col) for col in month_columns_numeric])
+    base_cols = ["CODIGO_MED"] + METRIC_COLS
+
+    if consumo_pivot.empty:
+        final_df = pd.DataFrame(
+            columns=base_cols + MPRODUCTO_COLS[1:] + months_for_output
+        )
+    else:
+        product_attr_cols_final = [
+            col
+            for col in MPRODUCTO_COLS
+            if col != "MEDCOD" and col in consumo_pivot.columns
+        ]
+
+        ordered_columns_for_selection = (
+            ["CODIGO_MED"]
+            + month_columns_numeric
+            + METRIC_COLS
+            + product_attr_cols_final
+        )
+        existing_cols_for_selection = [
+            col for col in ordered_columns_for_selection if col in consumo_pivot.columns
+        ]
+        final_df = consumo_pivot[existing_cols_for_selection].copy()
+
+        # Renombrar columnas numéricas de meses a string para la salida JSON
+        rename_map = {
+            num_col: str(num_col)
+            for num_col in month_columns_numeric
+            if num_col in final_df.columns
+        }
+        final_df.rename(columns=rename_map, inplace=True)
+
+        for month_str in months_for_output:
+            if month_str not in final_df.columns:
+                final_df[month_str] = 0.0
+
+        final_ordered_cols_with_str_months = (
+            ["CODIGO_MED"] + months_for_output + METRIC_COLS + product_attr_cols_final
+        )
+
+        for col_name in final_ordered_cols_with_str_months:
+            if col_name not in final_df.columns:
+                if col_name in base_cols or col_name in months_for_output:
+                    final_df[col_name] = 0.0  # Numéricas o meses
+                else:  # Atributos de producto
+                    final_df[col_name] = None
+
+        final_df = final_df[final_ordered_cols_with_str_months]
+
+    for col in DESCRIPTIVE_TEXT_COLS:
+        if col in final_df.columns:
+            final_df[col] = final_df[col].fillna("Desconocido")
+
+    final_df = final_df.replace({np.nan: None})
+
+    for month_str_col in months_for_output:
+        if month_str_col in final_df.columns:
+            final_df[month_str_col] = final_df[month_str_col].fillna(0.0)
+
+    return final_df, months_for_output
+
+
+def build_summary(
+    consumption: pd.DataFrame,
+    mstockalm_orig: pd.DataFrame,
+    mproducto_orig: pd.DataFrame,
+    start_date: int,
+    end_date: int,
+    product_type_list: list[str] | None = None,
+    strategy_list: list[str] | None = None,
+    real_time: bool = False,
+    timer: StageTimer | None = None,
+    sobrestock: float = SOBRESTOCK_MONTHS,
+    substock: float = SUBSTOCK_MONTHS,
+) -> dict[str, Any]:
+    """Resumen de consumo, stock y situación por producto en el rango ANNOMES dado.
+
+    `consumption` es tformdet pasado por `prepare_consumption`. `sobrestock` y
+    `substock` son los umbrales de SITUACION en meses de cobertura.
+
+    Cada etapa (filter, pivot, merge, classify, serialize) se mide en `timer`.
+    """
+    timer = timer or StageTimer()
+    product_type_list = product_type_list or []
+    strategy_list = strategy_list or []
+
+    with timer.stage("filter"):
+        mproducto_unique = filter_products(
+            mproducto_orig, product_type_list, strategy_list
+        )
+        tformdet = filter_consumption(consumption, start_date, end_date)
+
+        num_unique_anomes = 0
+        if not tformdet.empty:
+            num_unique_anomes = len(tformdet["ANNOMES"].unique())
+
+        if tformdet.empty:
+            return empty_summary()
+
+        tformdet = add_total_consumo(tformdet)
+
+        if product_type_list or strategy_list:
+            if not mproducto_unique.empty and "MEDCOD" in mproducto_unique.columns:
+                tformdet = tformdet.merge(
+                    mproducto_unique[["MEDCOD"]],
+                    left_on="CODIGO_MED",
+                    right_on="MEDCOD",
+                    how="inner",
+                )
+            else:
+                tformdet = pd.DataFrame(columns=tformdet.columns)
+
+            if tformdet.empty:
+                return empty_summary(num_unique_anomes)
+
+    with timer.stage("pivot"):
+        consumo_pivot, month_columns_numeric = pivot_consumption(tformdet)
+
+    with timer.stage("merge"):
+        consumo_pivot = merge_stock(consumo_pivot, tformdet, mstockalm_orig, real_time)
+
+    with timer.stage("classify"):
+        consumo_pivot = classify(consumo_pivot, sobrestock, substock)
+
+    with timer.stage("merge"):
+        consumo_pivot = merge_products(consumo_pivot, mproducto_unique)
+
+    with timer.stage("serialize"):
+        final_df, months_for_output = finalize(consumo_pivot, month_columns_numeric)
+        data_output = json.loads(final_df.to_json(orient="records", date_format="iso"))
+
+    return {
+        "count": len(final_df),
+        "data_count": len(data_output),
+        "anomes": num_unique_anomes,
+        "months": months_for_output,
+        "data": data_output,
+    }
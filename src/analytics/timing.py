@@ -0,0 +1,25 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+
+class StageTimer:
+    """Acumula la duración (tiempo real) de cada etapa con nombre de un cálculo.
+
+    Si se pasa `observer`, se llama con (etapa, segundos) al terminar cada etapa.
+    """
+
+    def __init__(self, observer: Callable[[str, float], None] | None = None) -> None:
+        self.durations: dict[str, float] = {}
+        self.observer = observer
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.durations[name] = self.durations.get(name, 0.0) + elapsed
+            if self.observer is not None:
+                self.observer(name, elapsed)
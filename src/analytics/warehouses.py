@@ -0,0 +1,187 @@
+import json
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.analytics.comparison import window_metrics
+from src.analytics.datasets import MSTOCKALM_CSV, register_index
+from src.analytics.pool import map_partitions
+from src.analytics.summary import (
+    DESCRIPTIVE_TEXT_COLS,
+    MPRODUCTO_COLS,
+    current_warehouse_stock,
+    filter_products,
+    situacion_array,
+)
+from src.analytics.timing import StageTimer
+from src.config import settings
+
+WAREHOUSE_COLS = [
+    "ALMCOD",
+    "CODIGO_MED",
+    "CPMA",
+    "CONSUMO_MEN",
+    "STOCK_FIN",
+    "NIVELES",
+    "SITUACION",
+]
+
+
+@register_index("warehouse_stock", MSTOCKALM_CSV)
+def prepare_warehouse_stock(mstockalm_orig: pd.DataFrame) -> pd.DataFrame:
+    """STOCK_FIN (suma de STKSALDO) por (ALMCOD, CODIGO_MED), ordenado por almacén.
+
+    Solo cuenta la fila más reciente de cada (ALMCOD, MEDCOD) (ver
+    `current_warehouse_stock`).
+    """
+    stock = current_warehouse_stock(mstockalm_orig)[
+        ["ALMCOD", "MEDCOD", "STKSALDO"]
+    ].dropna(subset=["ALMCOD", "MEDCOD"])
+    return (
+        stock.groupby(["ALMCOD", "MEDCOD"], sort=True)["STKSALDO"]
+        .sum()
+        .reset_index()
+        .rename(columns={"MEDCOD": "CODIGO_MED", "STKSALDO": "STOCK_FIN"})
+    )
+
+
+def summarize_warehouses(
+    stock: pd.DataFrame,
+    monthly: pd.DataFrame,
+    attributes: pd.DataFrame,
+    window: tuple[int, int],
+    months: np.ndarray,
+) -> dict[str, Any]:
+    """Resumen de un grupo de almacenes: métricas, atributos y registros JSON.
+
+    Se ejecuta en el pool de procesos con solo las filas de sus almacenes, el
+    consumo mensual y los atributos de los productos que aparecen en ellas.
+    `months` son los ANNOMES con datos de todo el resultado, para que el CPMA
+    no dependa del grupo.
+    """
+    if monthly.empty:
+        cpma = pd.DataFrame(columns=["CODIGO_MED", "CPMA", "CONSUMO_MEN"])
+    else:
+        metrics = window_metrics(monthly, [window], months=months)
+        cpma = pd.DataFrame(
+            {
+                "CODIGO_MED": metrics["products"],
+                "CPMA": metrics["CPMA"][:, 0],
+                "CONSUMO_MEN": metrics["CONSUMO_MEN"][:, 0],
+            }
+        )
+
+    result = stock.merge(cpma, on="CODIGO_MED", how="left")
+    result["CPMA"] = result["CPMA"].astype(float).fillna(0.0)
+    result["CONSUMO_MEN"] = result["CONSUMO_MEN"].astype(float).fillna(0).astype(int)
+
+    stock_fin = result["STOCK_FIN"].to_numpy(dtype=float)
+    cpma_values = result["CPMA"].to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        niveles = stock_fin / cpma_values
+    result["NIVELES"] = np.where(np.isfinite(niveles), niveles, 0.0)
+    result["SITUACION"] = situacion_array(
+        result["NIVELES"].to_numpy(), cpma_values, stock_fin
+    )
+    result = (
+        result[WAREHOUSE_COLS]
+        .merge(attributes, left_on="CODIGO_MED", right_on="MEDCOD", how="left")
+        .drop(columns=["MEDCOD"])
+    )
+    for col in DESCRIPTIVE_TEXT_COLS:
+        if col in result.columns:
+            result[col] = result[col].fillna("Desconocido")
+
+    situaciones = result.groupby(["ALMCOD", "SITUACION"]).size().unstack(fill_value=0)
+    return {
+        "warehouses": [
+            {
+                "ALMCOD": almcod,
+                "count": int(counts.sum()),
+                "situacion": {k: int(v) for k, v in counts.items() if v},
+            }
+            for almcod, counts in situaciones.iterrows()
+        ],
+        "data": json.loads(result.to_json(orient="records")),
+    }
+
+
+def partition_warehouses(stock: pd.DataFrame, parts: int) -> list[pd.DataFrame]:
+    """Reparte los almacenes en hasta `parts` grupos de tamaño parecido (en filas)."""
+    sizes = stock.groupby("ALMCOD", sort=True).size()
+    parts = max(1, min(parts, len(sizes)))
+    # Cada almacén va al grupo según la fracción de filas acumulada hasta él.
+    group = np.minimum(
+        ((sizes.cumsum() - sizes) * parts // max(len(stock), 1)).to_numpy(), parts - 1
+    )
+    labels = stock["ALMCOD"].map(dict(zip(sizes.index, group)))
+    return [part for _, part in stock.groupby(labels.to_numpy(), sort=True)]
+
+
+async def build_warehouse_summary(
+    monthly: pd.DataFrame,
+    warehouse_stock: pd.DataFrame,
+    mproducto_orig: pd.DataFrame,
+    start_date: int,
+    end_date: int,
+    almcod_list: list[str] | None = None,
+    product_type_list: list[str] | None = None,
+    strategy_list: list[str] | None = None,
+    timer: StageTimer | None = None,
+) -> dict[str, Any]:
+    """CPMA, STOCK_FIN, NIVELES y SITUACION por almacén y producto.
+
+    El CPMA es el del producto en el período (el consumo de tformdet no se
+    desglosa por almacén); STOCK_FIN es el STKSALDO del almacén. Se listan todos
+    los productos con stock registrado en mstockalm, tengan o no consumo.
+    """
+    timer = timer or StageTimer()
+    product_type_list = product_type_list or []
+    strategy_list = strategy_list or []
+
+    with timer.stage("filter"):
+        mproducto_unique = filter_products(
+            mproducto_orig, product_type_list, strategy_list
+        )
+        stock = warehouse_stock
+        if almcod_list:
+            stock = stock[stock["ALMCOD"].astype(str).isin(almcod_list)]
+        if product_type_list or strategy_list:
+            stock = stock[stock["CODIGO_MED"].isin(mproducto_unique["MEDCOD"])]
+        mask = (monthly["ANNOMES"] >= start_date) & (monthly["ANNOMES"] <= end_date)
+        monthly = monthly[mask & monthly["CODIGO_MED"].isin(stock["CODIGO_MED"])]
+
+    with timer.stage("partition"):
+        months = np.unique(monthly["ANNOMES"].to_numpy())
+        attr_cols = [
+            col for col in MPRODUCTO_COLS[1:] if col in mproducto_unique.columns
+        ]
+        attributes = mproducto_unique[["MEDCOD"] + attr_cols]
+        partitions = []
+        for part in partition_warehouses(stock, settings.ANALYTICS_WORKERS):
+            codes = part["CODIGO_MED"]
+            partitions.append(
+                (
+                    part,
+                    monthly[monthly["CODIGO_MED"].isin(codes)],
+                    attributes[attributes["MEDCOD"].isin(codes)],
+                    (start_date, end_date),
+                    months,
+                )
+            )
+
+    # Métricas, atributos y serialización de cada grupo de almacenes en el pool.
+    with timer.stage("classify"):
+        results = await map_partitions(summarize_warehouses, partitions)
+
+    with timer.stage("serialize"):
+        warehouses = [item for result in results for item in result["warehouses"]]
+        data = [record for result in results for record in result["data"]]
+
+    return {
+        "count": len(data),
+        "anomes": len(months),
+        "warehouses": warehouses,
+        "data": data,
+    }
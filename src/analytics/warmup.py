@@ -0,0 +1,107 @@
+import importlib
+import logging
+import sys
+import time
+from typing import Any
+
+from src.analytics.timing import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# Dependencias pesadas que la app no debería importar al arrancar.
+HEAVY_MODULES = ("pandas", "numpy", "sqlalchemy", "dbfread", "matplotlib", "sentry_sdk")
+
+# Módulos de análisis: al importarlos registran sus índices.
+ANALYTICS_MODULES = (
+    "datasets",
+    "summary",
+    "warehouses",
+    "expiry",
+    "forecast",
+    "bulk",
+    "simulation",
+)
+
+
+class WarmupState:
+    def __init__(self) -> None:
+        self.ready = False
+        self.error: str | None = None
+        # Tareas de arranque del worker que fallaron: etapa -> error
+        self.failures: dict[str, str] = {}
+        self.durations: dict[str, float] = {}
+        self.finished_at: float | None = None
+        # Arranque del worker: importación de la app y dependencias pesadas cargadas
+        self.boot: dict[str, Any] = {}
+
+    @property
+    def healthy(self) -> bool:
+        return self.ready and not self.failures
+
+    def fail(self, stage: str, error: BaseException) -> None:
+        self.failures[stage] = str(error) or type(error).__name__
+
+    def record_boot(self, import_seconds: float) -> None:
+        """Registra el tiempo de importación de la app y qué módulos pesados cargó."""
+        self.boot = {
+            "import_ms": round(import_seconds * 1000, 1),
+            "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules],
+        }
+        logger.info(
+            "App importada en %.0f ms; módulos pesados cargados: %s",
+            import_seconds * 1000,
+            ", ".join(self.boot["heavy_modules"]) or "ninguno",
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        if self.healthy:
+            status = "ready"
+        else:
+            status = "failed" if self.error or self.failures else "warming_up"
+        return {
+            "status": status,
+            "error": self.error,
+            "failures": self.failures,
+            "boot": self.boot,
+            "durations_ms": {k: round(v * 1000, 1) for k, v in self.durations.items()},
+        }
+
+
+state = WarmupState()
+
+
+def warm_up() -> WarmupState:
+    """Carga todos los datasets y construye todos los índices registrados en caché.
+
+    Se puede llamar más de una vez: tras el preload de gunicorn el worker solo
+    encuentra aciertos de caché. Bloquea; desde código async, en un hilo.
+    """
+    timer = StageTimer()
+    try:
+        # pandas y los módulos de análisis (que registran los índices) se importan
+        # aquí y no al importar la app; cada import se mide por separado.
+        for module in ANALYTICS_MODULES:
+            with timer.stage(f"import {module}"):
+                importlib.import_module(f"src.analytics.{module}")
+        from src.analytics import datasets
+
+        with timer.stage("datasets"):
+            for filename in datasets.DATASETS:
+                datasets.load_csv_data(filename)
+        with timer.stage("indexes"):
+            for name in datasets.registered_indexes():
+                datasets.get_index(name)
+    except Exception as e:
+        state.error = str(e)
+        logger.exception("Falló el warm-up")
+        return state
+
+    state.durations = timer.durations
+    state.error = None
+    state.ready = True
+    state.finished_at = time.time()
+    logger.info(
+        "Warm-up completo: %s",
+        ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in timer.durations.items()),
+    )
+    return state
@@ -0,0 +1,34 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from src.config import settings
+from src.exceptions import NotFound
+from src.profiling import ProfileStore
+
+router = APIRouter()
+
+store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+
+@router.get("/profiles")
+async def list_profiles() -> List[Dict[str, Any]]:
+    return store.list()
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str) -> Dict[str, Any]:
+    meta = store.get(profile_id)
+    if meta is None:
+        raise NotFound()
+    return meta
+
+
+@router.get("/profiles/{profile_id}/folded", response_class=PlainTextResponse)
+async def get_profile_folded(profile_id: str) -> str:
+    """Stacks colapsados: `flamegraph.pl perfil.folded > perfil.svg` o speedscope."""
+    folded = store.get_folded(profile_id)
+    if folded is None:
+        raise NotFound()
+    return folded
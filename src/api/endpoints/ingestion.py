@@ -0,0 +1,42 @@
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Query, status
+
+from src.data.sources import SOURCES
+from src.exceptions import BadRequest, NotFound
+
+router = APIRouter()
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def start_ingestion(
+    table: Optional[List[str]] = Query(
+        None, description="Tablas a ingerir (por defecto todas)"
+    ),
+    batch_size: int = Query(5_000, ge=100, le=100_000),
+) -> Dict[str, Any]:
+    """Lanza la ingesta de los DBF en segundo plano, o devuelve la que está en curso."""
+    from src.data.ingest import start_ingestion_job
+
+    tables = table or list(SOURCES)
+    unknown = [t for t in tables if t not in SOURCES]
+    if unknown:
+        raise BadRequest(f"Tablas desconocidas: {', '.join(unknown)}")
+    return await start_ingestion_job(tables, batch_size)
+
+
+@router.get("")
+async def list_ingestions() -> List[Dict[str, Any]]:
+    from src.data.ingest import list_ingestion_jobs
+
+    return await list_ingestion_jobs()
+
+
+@router.get("/{job_id}")
+async def get_ingestion(job_id: str) -> Dict[str, Any]:
+    from src.data.ingest import get_ingestion_job
+
+    job = await get_ingestion_job(job_id)
+    if job is None:
+        raise NotFound()
+    return job
@@ -1,6 +1,13 @@
 from fastapi import APIRouter
-from .endpoints import data
+
+from src.config import settings
+
+from .endpoints import data, debug, ingestion
 
 api_router = APIRouter()
 
-api_router.include_router(data.router, prefix="/data", tags=["data"])
\ No newline at end of file
+api_router.include_router(data.router, prefix="/data", tags=["data"])
+api_router.include_router(ingestion.router, prefix="/ingestions", tags=["ingestion"])
+
+if settings.ENVIRONMENT.is_debug:
+    api_router.include_router(debug.router, prefix="/debug", tags=["debug"])
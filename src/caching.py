@@ -0,0 +1,110 @@
+"""GET condicional para los endpoints de análisis.
+
+Las respuestas de /api/data solo cambian cuando cambia algún CSV, así que el ETag
+se deriva de las versiones de los CSV (mtime y tamaño, como en la caché de
+datasets) y de la query normalizada. Un If-None-Match que coincide (o un
+If-Modified-Since reciente) se responde con 304 antes de ejecutar el endpoint,
+sin pandas ni carga de datasets.
+
+Algunas respuestas dependen además de la fecha de hoy (el `as_of` por defecto de
+/expiry): sin el parámetro, la fecha efectiva entra en el ETag y Last-Modified
+no es anterior al comienzo del día, así un 304 no sobrevive al cambio de fecha.
+"""
+
+import hashlib
+import time
+from datetime import date
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+from fastapi import Request, Response
+
+from src.config import settings
+from src.exceptions import NotModified
+
+# Ruta -> parámetro que, si no se envía, vale la fecha de hoy (DD-MM-YYYY).
+TODAY_DEFAULTS = {"/api/data/expiry": "as_of"}
+
+
+def dataset_state(data_dir: Path = settings.DATA_DIR) -> tuple[str, float]:
+    """(versión, última modificación) de los CSV, solo con stat()."""
+    stats = sorted((path.name, path.stat()) for path in data_dir.glob("*.csv"))
+    version = ";".join(f"{name}:{st.st_mtime_ns}:{st.st_size}" for name, st in stats)
+    last_modified = max((st.st_mtime for _, st in stats), default=0.0)
+    return version, last_modified
+
+
+def normalized_query(query: str) -> str:
+    """Query string con los parámetros ordenados por nombre y sin valores vacíos.
+
+    Se conserva el orden de los valores de un mismo parámetro: en algunos
+    importa (el primer ?period= es la referencia de /comparison).
+    """
+    params = [
+        (name, value.strip())
+        for name, value in parse_qsl(query, keep_blank_values=True)
+        if value.strip()
+    ]
+    return "&".join(
+        f"{name}={value}" for name, value in sorted(params, key=lambda p: p[0])
+    )
+
+
+def effective_query(path: str, query: str, today: date) -> str:
+    """`query` con la fecha de hoy en el parámetro de TODAY_DEFAULTS si falta."""
+    param = TODAY_DEFAULTS.get(path)
+    sent = {name for name, _ in parse_qsl(normalized_query(query))}
+    if param is None or param in sent:
+        return query
+    return f"{query}&{param}={today.strftime('%d-%m-%Y')}"
+
+
+def make_etag(version: str, path: str, query: str) -> str:
+    key = "|".join((settings.APP_VERSION, version, path, normalized_query(query)))
+    return f'"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # Comparación débil (RFC 9110): W/"x" equivale a "x".
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def _not_modified_since(header: str, last_modified: float) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= since.timestamp()
+
+
+async def conditional_get(request: Request, response: Response) -> None:
+    """Dependencia del router: cabeceras ETag/Last-Modified/Cache-Control, o 304."""
+    if request.method not in ("GET", "HEAD"):
+        return
+
+    version, last_modified = dataset_state()
+    path, query = request.url.path, request.url.query
+    if path in TODAY_DEFAULTS:
+        today = date.today()
+        query = effective_query(path, query, today)
+        last_modified = max(last_modified, time.mktime(today.timetuple()))
+    headers = {
+        "ETag": make_etag(version, path, query),
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={settings.CACHE_MAX_AGE}",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, headers["ETag"])
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = if_modified_since is not None and _not_modified_since(
+            if_modified_since, last_modified
+        )
+    if not_modified:
+        raise NotModified(headers=headers)
+
+    response.headers.update(headers)
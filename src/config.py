@@ -1,3 +1,4 @@
+from pathlib import Path
 from typing import Any
 
 from pydantic import PostgresDsn, model_validator
@@ -29,6 +30,26 @@ class Config(CustomBaseSettings):
 
     APP_VERSION: str = "0.1"
 
+    DATA_DIR: Path = Path(__file__).resolve().parent / "data"
+    # Filas rechazadas por la validación de la ingesta y su reporte por tabla.
+    QUARANTINE_DIR: Path = Path(__file__).resolve().parent / "data" / "quarantine"
+
+    # Procesos por worker para cálculos repartidos por partición (p. ej. por ALMCOD);
+    # 0 o 1 los ejecuta en el propio worker. Desactivado por defecto: cada proceso
+    # multiplica la memoria por worker de gunicorn.
+    ANALYTICS_WORKERS: int = 0
+
+    # max-age (segundos) de las respuestas GET de /api/data; un proxy puede
+    # servirlas de su caché y revalidarlas con el ETag.
+    CACHE_MAX_AGE: int = 300
+
+    PROFILING_ENABLED: bool = False
+    PROFILING_THRESHOLD_MS: int = 2000
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_MS: int = 10
+    PROFILING_DIR: Path = Path("/tmp/profiles")
+    PROFILING_MAX_PROFILES: int = 100
+
     @model_validator(mode="after")
     def validate_sentry_non_local(self) -> "Config":
         if self.ENVIRONMENT.is_deployed and not self.SENTRY_DSN:
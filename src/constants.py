@@ -1,5 +1,10 @@
 from enum import Enum
 
+# Límites de las consultas de /api/data, compartidos por los modelos de la API y
+# src.analytics (que no se importa al validar para no cargar pandas).
+MAX_BULK_CODES = 20_000
+MAX_SCENARIOS = 1_000
+
 DB_NAMING_CONVENTION = {
     "ix": "%(column_0_label)s_idx",
     "uq": "%(table_name)s_%(column_0_name)s_key",
@@ -1,158 +1,281 @@
+import argparse
+import asyncio
 import csv
-from dbfread import DBF
+import logging
+import time
 from pathlib import Path
 
-campos_tformdet = [
-    'CODIGO_EJE', 'CODIGO_PRE', 'TIPSUM', 'ANNOMES', 'CODIGO_MED',
-    'PRECIO', 'INGRE', 'VENTA', 'SIS', 'INTERSAN',
-    'STOCK_FIN', 'FEC_EXP', 'MEDLOTE', 'MEDREGSAN'
-]
-campos_mstockalm = [
-    'ALMCOD' ,'MEDCOD' ,'STKSALDO', 'STKPRECIO', 'STKFECHULT', 'FLG_SOCKET'
-]
+from dbfread import DBF
+
+from src import metrics
+from src.data.sources import DBF_DIR, SOURCES, find_dbf_files
 
+logger = logging.getLogger(__name__)
 
-CURRENT_DIR = Path(__file__).resolve().parent
+# Registros por lote al combinar y validar los DBF.
+BATCH_SIZE = 5_000
 
-TFORMDET_DBF = CURRENT_DIR / 'dbf' / 'TFORMDET.DBF'
-TFORMDET_CSV = CURRENT_DIR / 'tformdet.csv'
-MUSUARIO_DBF = CURRENT_DIR / 'dbf' / 'MUSUARIO.DBF'
-MUSUARIO_CSV = CURRENT_DIR / 'usuario.csv'
-MPRODUCTO_DBF = CURRENT_DIR / 'dbf' / 'MPRODUCTO.DBF'
-MPRODUCTO_CSV = CURRENT_DIR / 'mproducto.csv'
-MSTOCK_DBF = CURRENT_DIR / 'dbf' / 'MSTOCKALM.DBF'
-MSTOCK_CSV = CURRENT_DIR / 'mstockalm.csv'
 
 def process_dbf_to_csv(dbf_path, csv_path, campos=None):
-    print(f"Procesando {dbf_path} -> {csv_path}")
-    
+    logger.info("Procesando %s -> %s", dbf_path, csv_path)
+    start = time.perf_counter()
+    rows = 0
+
     dbf = DBF(dbf_path)
     dbf.load()
     if campos is None:
         campos = dbf.field_names
-        print(f"Campos detectados automáticamente: {campos}")
-    
-    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        logger.info("Campos detectados automáticamente: %s", campos)
+
+    with open(csv_path, "w", newline="", encoding="utf-8") as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(campos) 
-        
+        writer.writerow(campos)
+
         for record in dbf:
-            row = [record.get(campo, '') for campo in campos]
+            row = [record.get(campo, "") for campo in campos]
             writer.writerow(row)
-    
-    print(f"Archivo CSV generado: {csv_path}")
+            rows += 1
 
+    table = Path(csv_path).stem
+    metrics.DBF_INGEST_LATENCY.labels(table=table).observe(time.perf_counter() - start)
+    metrics.DBF_INGEST_ROWS.labels(table=table).inc(rows)
+    logger.info("Archivo CSV generado: %s", csv_path)
 
-def multiple_dbf_to_csv(dbf_paths, csv_path, campos=None):
-    all_rows = []
-    for path in dbf_paths:
-        dbf = DBF(path)
-        dbf.load()
-        if campos is None:
-            campos = dbf.field_names
-        for record in dbf:
-            all_rows.append([record.get(campo, '') for campo in campos])
 
-    with open(csv_path, 'w', newline='', encoding='latin1') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(campos)
-        writer.writerows(all_rows)
-    
-    print(f"CSV combinado generado: {csv_path}")
+def multiple_dbf_to_csv(
+    dbf_paths,
+    csv_path,
+    output_campos=None,
+    dbf_read_encoding=None,
+    csv_write_encoding="utf-8",
+    table=None,
+    batch_size=BATCH_SIZE,
+    quarantine_dir=None,
+):
+    """Combina varios DBF en un CSV, por lotes. Con `table`, cada lote pasa por la
+    validación de calidad y las filas rechazadas quedan en cuarentena."""
+    import pandas as pd
+
+    from src.data.validation import Validator, to_csv_frame, validation_order
 
-def multiple_dbf_to_csv(dbf_paths, csv_path, output_campos=None, dbf_read_encoding=None, csv_write_encoding='utf-8'):
-    all_rows = []
     actual_header_fields = None
-    
-    print(f"Starting combination for CSV: {csv_path}")
+    validator = None
+    if table:
+        validator = Validator(table, quarantine_dir)
+        dbf_paths = validation_order(table, list(dbf_paths))
+    rows_written = 0
+    start = time.perf_counter()
+
+    logger.info("Starting combination for CSV: %s", csv_path)
     if dbf_read_encoding:
-        print(f"Attempting to read DBF files with encoding: {dbf_read_encoding}")
-
-    for i, path_obj in enumerate(dbf_paths):
-        path_str = str(path_obj) # dbfread expects string paths
-        try:
-            print(f"Processing DBF: {path_str}")
-            # Specify the encoding for reading the DBF file and error handling
-            dbf = DBF(path_str, encoding=dbf_read_encoding, char_decode_errors='ignore')
-            
-            if actual_header_fields is None:
-                if output_campos:
-                    actual_header_fields = list(output_campos)
-                else:
-                    actual_header_fields = list(dbf.field_names)
-                print(f"Using header fields for CSV: {actual_header_fields}")
-
-            for record in dbf: # Iterating is memory-efficient
-                row = [record.get(campo, '') for campo in actual_header_fields]
-                all_rows.append(row)
-        
-        except UnicodeDecodeError as e:
-            print(f"ERROR: Could not decode {path_str} using encoding '{dbf_read_encoding if dbf_read_encoding else 'dbfread default'}'.")
-            print(f"Specific error: {e}")
-            if hasattr(e, 'object') and isinstance(e.object, bytes) and hasattr(e, 'start') and hasattr(e, 'end'):
-                 print(f"Problematic byte sequence: {e.object[e.start:e.end]}")
-            print(f"Consider trying other encodings like 'latin1', 'cp850', 'utf-8', or check the DBF file's origin.")
-            print(f"Skipping file {path_str} due to decoding error.")
-            continue 
-        except Exception as e:
-            print(f"An unexpected error occurred while processing {path_str}: {e}")
-            # If actual_header_fields could not be set (e.g. first file failed), we should not proceed.
-            if actual_header_fields is None and i == 0 :
-                print("Failed to process the first DBF file, cannot determine headers. Aborting.")
+        logger.info("Attempting to read DBF files with encoding: %s", dbf_read_encoding)
+
+    # Se escribe a un temporal y se reemplaza al final: el CSV anterior sigue
+    # disponible para la API mientras tanto.
+    tmp_path = Path(f"{csv_path}.tmp")
+    csvfile = open(tmp_path, "w", newline="", encoding=csv_write_encoding)
+
+    def write_batch(batch):
+        nonlocal rows_written
+        frame = pd.DataFrame(batch, columns=actual_header_fields)
+        if validator is not None:
+            frame = to_csv_frame(validator.validate(frame), table)
+        frame.to_csv(csvfile, header=csvfile.tell() == 0, index=False)
+        rows_written += len(frame)
+
+    try:
+        for i, path_obj in enumerate(dbf_paths):
+            path_str = str(path_obj)  # dbfread expects string paths
+            try:
+                logger.info("Processing DBF: %s", path_str)
+                # Specify the encoding for reading the DBF file and error handling
+                dbf = DBF(
+                    path_str, encoding=dbf_read_encoding, char_decode_errors="ignore"
+                )
+
+                if actual_header_fields is None:
+                    if output_campos:
+                        actual_header_fields = list(output_campos)
+                    else:
+                        actual_header_fields = list(dbf.field_names)
+                    logger.info("Using header fields for CSV: %s", actual_header_fields)
+
+                batch = []
+                for record in dbf:  # Iterating is memory-efficient
+                    batch.append(
+                        [record.get(campo, "") for campo in actual_header_fields]
+                    )
+                    if len(batch) >= batch_size:
+                        write_batch(batch)
+                        batch = []
+                if batch:
+                    write_batch(batch)
+
+            except UnicodeDecodeError as e:
+                logger.error(
+                    "Could not decode %s using encoding '%s' (%s). Consider trying "
+                    "other encodings like 'latin1', 'cp850', 'utf-8'. Skipping file.",
+                    path_str,
+                    dbf_read_encoding or "dbfread default",
+                    e,
+                )
+                continue
+            except UnicodeEncodeError as e:
+                logger.error(
+                    "Could not write CSV file %s with encoding '%s' (%s). "
+                    "Consider using 'utf-8'.",
+                    csv_path,
+                    csv_write_encoding,
+                    e,
+                )
                 return
-            continue
+            except ValueError:
+                # Esquema inválido (faltan columnas): no se genera un CSV a medias.
+                logger.exception("Validation failed for %s", path_str)
+                return
+            except Exception:
+                logger.exception(
+                    "An unexpected error occurred while processing %s", path_str
+                )
+                # If actual_header_fields could not be set (e.g. first file failed),
+                # we should not proceed.
+                if actual_header_fields is None and i == 0:
+                    logger.error(
+                        "Failed to process the first DBF file, cannot determine "
+                        "headers. Aborting."
+                    )
+                    return
+                continue
+
+        if not actual_header_fields:
+            logger.error(
+                "Could not determine header fields. No CSV file generated for %s.",
+                csv_path,
+            )
+            return
+
+        if not rows_written:
+            logger.warning(
+                "No data rows were collected. "
+                "The CSV file %s will contain only headers.",
+                csv_path,
+            )
+            if csvfile.tell() == 0:
+                csvfile.write(",".join(actual_header_fields) + "\n")
 
-    if not actual_header_fields:
-        print(f"Could not determine header fields (e.g., all DBF paths failed or were empty). No CSV file generated for {csv_path}.")
-        return
+        csvfile.close()
+        tmp_path.replace(csv_path)
+        # La cuarentena se escribe una vez reemplazado el CSV.
+        if validator is not None:
+            validator.commit()
+        table_name = Path(csv_path).stem
+        metrics.DBF_INGEST_LATENCY.labels(table=table_name).observe(
+            time.perf_counter() - start
+        )
+        metrics.DBF_INGEST_ROWS.labels(table=table_name).inc(rows_written)
+        logger.info(
+            "CSV combinado generado: %s (con %d filas de datos y codificación '%s')",
+            csv_path,
+            rows_written,
+            csv_write_encoding,
+        )
+    finally:
+        csvfile.close()
+        tmp_path.unlink(missing_ok=True)
+        if validator is not None:
+            validator.finish()
 
-    if not all_rows:
-        print(f"Warning: No data rows were collected. The CSV file {csv_path} will contain only headers (if headers were determined).")
 
+def validate_csv(table, csv_path, batch_size=BATCH_SIZE):
+    """Valida un CSV ya generado y lo reescribe solo con las filas válidas."""
+    import pandas as pd
+
+    from src.data.validation import SCHEMAS, Validator, newest_first, to_csv_frame
+
+    validator = Validator(table)
+    tmp_path = Path(f"{csv_path}.tmp")
+    # dtype=str: los valores llegan como en el DBF, sin inferencia de pandas.
+    if SCHEMAS[table].newest_by:
+        # Para saber qué versión de cada clave es la más nueva se lee todo el CSV.
+        frame = newest_first(pd.read_csv(csv_path, dtype=str), table)
+        chunks = (
+            frame[start : start + batch_size]
+            for start in range(0, len(frame), batch_size)
+        )
+    else:
+        chunks = pd.read_csv(csv_path, dtype=str, chunksize=batch_size)
     try:
-        with open(csv_path, 'w', newline='', encoding=csv_write_encoding) as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(actual_header_fields)
-            writer.writerows(all_rows)
-        print(f"CSV combinado generado: {csv_path} (con {len(all_rows)} filas de datos y codificación '{csv_write_encoding}')")
-    except UnicodeEncodeError as e:
-        print(f"ERROR: Could not write CSV file {csv_path} with encoding '{csv_write_encoding}'.")
-        print(f"Data might contain characters not representable in '{csv_write_encoding}'.")
-        print(f"Specific error: {e}")
-        print(f"Consider using 'utf-8' as the csv_write_encoding for the multiple_dbf_to_csv function.")
-    except Exception as e:
-        print(f"An error occurred during CSV writing for {csv_path}: {e}")
-
-
-'''multiple_dbf_to_csv(
-    [CURRENT_DIR / 'dbf' / '2021' / 'TFORMDET.DBF', CURRENT_DIR / 'dbf' / '2022' / 'TFORMDET.DBF', 
-     CURRENT_DIR / 'dbf' / '2023' / 'TFORMDET.DBF', CURRENT_DIR / 'dbf' / '2024' / 'TFORMDET.DBF'],
-    CURRENT_DIR / 'tformdet.csv',
-    campos_tformdet
-)
-multiple_dbf_to_csv(
-    [CURRENT_DIR / 'dbf' / '2021' / 'MSTOCKALM.DBF', CURRENT_DIR / 'dbf' / '2022' / 'MSTOCKALM.DBF', 
-     CURRENT_DIR / 'dbf' / '2023' / 'MSTOCKALM.DBF', CURRENT_DIR / 'dbf' / '2024' / 'MSTOCKALM.DBF'],
-    CURRENT_DIR / 'mstockalm.csv',
-    campos_mstockalm
-)'''
-multiple_dbf_to_csv(
-    [CURRENT_DIR / 'dbf' / '2021' / 'MPRODUCTO.DBF', CURRENT_DIR / 'dbf' / '2022' / 'MPRODUCTO.DBF', 
-     CURRENT_DIR / 'dbf' / '2023' / 'MPRODUCTO.DBF', CURRENT_DIR / 'dbf' / '2024' / 'MPRODUCTO.DBF'],
-    CURRENT_DIR / 'mproducto.csv'
-) 
-
-# process_dbf_to_csv(TFORMDET_DBF, TFORMDET_CSV, campos_tformdet)
-# process_dbf_to_csv(MSTOCK_DBF, MSTOCK_CSV, campos_mstockalm)
-# process_dbf_to_csv(MPRODUCTO_DBF, MPRODUCTO_CSV)
-# process_dbf_to_csv(MUSUARIO_DBF, MUSUARIO_CSV)
-
-# def main():
-#     process_dbf_to_csv(TFORMDET_DBF, TFORMDET_CSV, campos_tformdet)
-#     process_dbf_to_csv(MSTOCK_DBF, MSTOCK_CSV, campos_mstockalm)
-#     process_dbf_to_csv(MPRODUCTO_DBF, MPRODUCTO_CSV)
-#     process_dbf_to_csv(MUSUARIO_DBF, MUSUARIO_CSV)
-#     pass
-
-# if __name__ == "__main__":
-#     main()
\ No newline at end of file
+        with open(tmp_path, "w", newline="", encoding="utf-8") as csvfile:
+            for i, chunk in enumerate(chunks):
+                to_csv_frame(validator.validate(chunk), table).to_csv(
+                    csvfile, header=i == 0, index=False
+                )
+        tmp_path.replace(csv_path)
+        validator.commit()
+    finally:
+        tmp_path.unlink(missing_ok=True)
+        validator.finish()
+
+
+def export_csv(tables, batch_size=BATCH_SIZE, encoding=None):
+    for table in tables:
+        dbf_name, csv_path, campos = SOURCES[table]
+        dbf_paths = find_dbf_files(dbf_name)
+        if not dbf_paths:
+            logger.warning("No se encontraron archivos %s en %s", dbf_name, DBF_DIR)
+            continue
+        multiple_dbf_to_csv(
+            dbf_paths,
+            csv_path,
+            campos,
+            dbf_read_encoding=encoding,
+            table=table,
+            batch_size=batch_size,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Procesa los DBF del sistema de farmacia"
+    )
+    parser.add_argument(
+        "target",
+        choices=["csv", "db", "validate"],
+        nargs="?",
+        default="csv",
+        help="csv: regenera los CSV de src/data; db: ingesta en la base de datos; "
+        "validate: valida los CSV existentes y deja en cuarentena las filas inválidas",
+    )
+    parser.add_argument(
+        "--table",
+        action="append",
+        choices=list(SOURCES),
+        help="Tablas a procesar (por defecto todas)",
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--encoding", default=None, help="Codificación de lectura de los DBF"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s] [%(levelname)s] [%(name)s] %(message)s",
+    )
+    tables = args.table or list(SOURCES)
+
+    if args.target == "csv":
+        export_csv(tables, batch_size=args.batch_size, encoding=args.encoding)
+    elif args.target == "validate":
+        for table in tables:
+            validate_csv(table, SOURCES[table][1], batch_size=args.batch_size)
+    else:
+        from src.data.ingest import ingest_tables
+
+        asyncio.run(
+            ingest_tables(tables, batch_size=args.batch_size, encoding=args.encoding)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,565 @@
+"""Ingesta de los DBF a Postgres por lotes, en streaming.
+
+Cada archivo se carga en una sola transacción: la lectura del DBF (en un hilo) va
+un par de lotes por delante del COPY, y una re-ejecución con el mismo archivo no
+hace nada. Si el archivo cambió, sus filas anteriores se reemplazan. Cada lote
+pasa antes por la validación de calidad (src.data.validation); las filas
+rechazadas van a cuarentena en lugar de a la base.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+from dbfread import DBF
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Float,
+    Integer,
+    Table,
+    delete,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src import metrics
+from src.data.sources import DBF_DIR, SOURCES, find_dbf_files
+from src.data.validation import SCHEMAS, Validator, to_records, validation_order
+from src.database import (
+    dbf_ingestion,
+    engine,
+    execute,
+    fetch_all,
+    fetch_one,
+    ingestion_job,
+    mproducto,
+    mstockalm,
+    tformdet,
+)
+
+logger = logging.getLogger(__name__)
+
+TABLES: dict[str, Table] = {
+    "tformdet": tformdet,
+    "mstockalm": mstockalm,
+    "mproducto": mproducto,
+}
+
+# Lotes leídos por adelantado mientras el anterior se escribe con COPY.
+PIPELINE_DEPTH = 2
+# Segundos entre mensajes de progreso en el log (y latidos de los trabajos).
+PROGRESS_INTERVAL = 5.0
+# Un trabajo "running" sin latido en este tiempo murió con su worker.
+JOB_STALE_AFTER = timedelta(minutes=2)
+
+
+@dataclass
+class IngestionProgress:
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    tables: list[str] = field(default_factory=list)
+    status: str = "pending"
+    current_file: str | None = None
+    files_total: int = 0
+    files_done: int = 0
+    files_skipped: int = 0
+    rows: int = 0
+    rejected: int = 0
+    invalid_values: int = 0
+    quality: dict[str, dict[str, Any]] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    error: str | None = None
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "tables": self.tables,
+            "status": self.status,
+            "current_file": self.current_file,
+            "files_total": self.files_total,
+            "files_done": self.files_done,
+            "files_skipped": self.files_skipped,
+            "rows": self.rows,
+            "rejected": self.rejected,
+            "invalid_values": self.invalid_values,
+            "quality": self.quality,
+            "rows_per_second": round(self.rows_per_second, 1),
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "finished_at": (
+                datetime.fromtimestamp(self.finished_at).isoformat()
+                if self.finished_at
+                else None
+            ),
+            "error": self.error,
+        }
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    return datetime.strptime(text[:10], "%Y-%m-%d" if "-" in text else "%Y%m%d").date()
+
+
+def _to_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    return datetime.fromisoformat(str(value).strip())
+
+
+def _converter(column_type: Any) -> Callable[[Any], Any]:
+    if isinstance(column_type, Integer):
+        return lambda value: int(float(value))
+    if isinstance(column_type, Float):
+        return float
+    if isinstance(column_type, DateTime):
+        return _to_datetime
+    if isinstance(column_type, Date):
+        return _to_date
+    return str
+
+
+class RowConverter:
+    """Registro del DBF -> tupla en el orden de columnas (ingestion_id primero)."""
+
+    def __init__(self, table: Table, ingestion_id: int) -> None:
+        self.columns = [c.name for c in table.columns if c.name not in ("id",)]
+        self.fields = [
+            (c.name.upper(), _converter(c.type))
+            for c in table.columns
+            if c.name not in ("id", "ingestion_id")
+        ]
+        self.ingestion_id = ingestion_id
+        self.invalid_values = 0
+
+    def __call__(self, record: dict[str, Any]) -> tuple:
+        row: list[Any] = [self.ingestion_id]
+        for name, convert in self.fields:
+            value = record.get(name)
+            if value is None or value == "":
+                row.append(None)
+                continue
+            try:
+                row.append(convert(value))
+            except (TypeError, ValueError):
+                self.invalid_values += 1
+                row.append(None)
+        return tuple(row)
+
+
+def file_checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_path(path: Path) -> str:
+    try:
+        return str(path.resolve().relative_to(DBF_DIR))
+    except ValueError:
+        return str(path.resolve())
+
+
+async def _write_batch(
+    connection: AsyncConnection, table: Table, columns: list[str], rows: list[tuple]
+) -> None:
+    raw = await connection.get_raw_connection()
+    driver_connection = raw.driver_connection
+    if hasattr(driver_connection, "copy_records_to_table"):
+        # asyncpg: COPY binario dentro de la transacción de `connection`.
+        await driver_connection.copy_records_to_table(
+            table.name, records=rows, columns=columns
+        )
+    else:
+        await connection.execute(
+            table.insert(), [dict(zip(columns, row)) for row in rows]
+        )
+
+
+def _read_batches(
+    path: Path, encoding: str | None, batch_size: int
+) -> Iterator[list[dict[str, Any]]]:
+    dbf = DBF(str(path), encoding=encoding, char_decode_errors="ignore")
+    records: list[dict[str, Any]] = []
+    for record in dbf:
+        records.append(record)
+        if len(records) >= batch_size:
+            yield records
+            records = []
+    if records:
+        yield records
+
+
+def _seed_validator(
+    path: Path, validator: Validator, batch_size: int, encoding: str | None
+) -> None:
+    for records in _read_batches(path, encoding, batch_size):
+        validator.seed(pd.DataFrame.from_records(records))
+
+
+async def _stream_batches(
+    path: Path,
+    convert: RowConverter,
+    validator: Validator,
+    batch_size: int,
+    encoding: str | None,
+    write: Callable[[list[tuple]], Any],
+) -> int:
+    """Lee y valida `path` en un hilo, PIPELINE_DEPTH lotes por delante de `write`."""
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue[list[tuple] | None] = asyncio.Queue(maxsize=PIPELINE_DEPTH)
+    stop = threading.Event()
+
+    def put(item: list[tuple] | None) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def validated(records: list[dict[str, Any]]) -> list[tuple]:
+        frame = validator.validate(pd.DataFrame.from_records(records))
+        return [convert(record) for record in to_records(frame)]
+
+    def produce() -> None:
+        try:
+            for records in _read_batches(path, encoding, batch_size):
+                put(validated(records))
+                if stop.is_set():
+                    return
+        finally:
+            put(None)
+
+    reader = asyncio.create_task(asyncio.to_thread(produce))
+    rows = 0
+    try:
+        while (batch := await queue.get()) is not None:
+            await write(batch)
+            rows += len(batch)
+    except BaseException:
+        stop.set()
+        # Vaciar la cola para que el hilo lector no quede bloqueado en put().
+        while not reader.done():
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                await asyncio.sleep(0.01)
+        raise
+    await reader
+    return rows
+
+
+async def ingest_file(
+    table_name: str,
+    path: Path,
+    progress: IngestionProgress,
+    batch_size: int = 5_000,
+    encoding: str | None = None,
+    validator: Validator | None = None,
+    seed_on_skip: bool = False,
+    force: bool = False,
+) -> int | None:
+    """Carga un DBF; devuelve las filas escritas, o None si ya estaba cargado.
+
+    Los archivos de una tabla comparten `validator` para detectar claves
+    duplicadas entre ellos. Con `seed_on_skip`, un archivo sin cambios se lee
+    igual (sin escribirlo) para que sus claves cuenten en los siguientes; con
+    `force` se vuelve a cargar aunque no haya cambiado. La cuarentena del
+    archivo se escribe recién después del commit.
+    """
+    table = TABLES[table_name]
+    validator = validator or Validator(table_name)
+    source_path = _source_path(path)
+    checksum = await asyncio.to_thread(file_checksum, path)
+    start = time.perf_counter()
+    rejected_before = validator.report.rejected
+
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(
+                pg_insert(dbf_ingestion)
+                .values(table_name=table_name, source_path=source_path, checksum="")
+                .on_conflict_do_nothing(index_elements=["table_name", "source_path"])
+            )
+            # El lock de fila serializa ejecuciones concurrentes sobre el mismo archivo.
+            existing = (
+                await connection.execute(
+                    select(dbf_ingestion)
+                    .where(
+                        dbf_ingestion.c.table_name == table_name,
+                        dbf_ingestion.c.source_path == source_path,
+                    )
+                    .with_for_update()
+                )
+            ).one()
+            unchanged = existing.checksum == checksum and not force
+            if not unchanged:
+                ingestion_id = existing.id
+                await connection.execute(
+                    delete(table).where(table.c.ingestion_id == ingestion_id)
+                )
+
+                convert = RowConverter(table, ingestion_id)
+                last_report = time.perf_counter()
+                written = 0
+
+                async def write(batch: list[tuple]) -> None:
+                    nonlocal last_report, written
+                    await _write_batch(connection, table, convert.columns, batch)
+                    written += len(batch)
+                    if time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+                        last_report = time.perf_counter()
+                        logger.info(
+                            "%s: %d filas escritas (%.0f filas/s)",
+                            source_path,
+                            written,
+                            written / (last_report - start),
+                        )
+
+                rows = await _stream_batches(
+                    path, convert, validator, batch_size, encoding, write
+                )
+                await connection.execute(
+                    update(dbf_ingestion)
+                    .where(dbf_ingestion.c.id == ingestion_id)
+                    .values(
+                        checksum=checksum,
+                        rows=rows,
+                        started_at=func.now(),
+                        finished_at=func.now(),
+                    )
+                )
+
+        if unchanged:
+            logger.info("%s sin cambios, se omite", source_path)
+            if seed_on_skip:
+                await asyncio.to_thread(
+                    _seed_validator, path, validator, batch_size, encoding
+                )
+    except BaseException:
+        validator.rollback()
+        raise
+    validator.commit()
+    if unchanged:
+        return None
+
+    # Solo después del commit: las filas de una transacción revertida no cuentan.
+    elapsed = time.perf_counter() - start
+    rejected = validator.report.rejected - rejected_before
+    progress.rows += rows
+    progress.rejected += rejected
+    progress.invalid_values += convert.invalid_values
+    metrics.DBF_INGEST_LATENCY.labels(table=table_name).observe(elapsed)
+    metrics.DBF_INGEST_ROWS.labels(table=table_name).inc(rows)
+    logger.info(
+        "%s: %d filas en %.1fs (%.0f filas/s, %d en cuarentena, %d valores inválidos)",
+        source_path,
+        rows,
+        elapsed,
+        rows / elapsed if elapsed else 0.0,
+        rejected,
+        convert.invalid_values,
+    )
+    return rows
+
+
+async def ingest_tables(
+    tables: list[str],
+    batch_size: int = 5_000,
+    encoding: str | None = None,
+    progress: IngestionProgress | None = None,
+) -> IngestionProgress:
+    progress = progress or IngestionProgress()
+    progress.tables = list(tables)
+    files = [
+        (table, path)
+        for table in tables
+        for path in validation_order(table, find_dbf_files(SOURCES[table][0]))
+    ]
+    progress.files_total = len(files)
+    progress.status = "running"
+    validators = {table: Validator(table) for table in tables}
+    # Las claves de un archivo sin cambios solo importan si la tabla tiene otros.
+    several = {table for table in tables if sum(t == table for t, _ in files) > 1}
+    # En las tablas donde gana el archivo más reciente, si uno cambia los más
+    # antiguos se vuelven a validar contra él y a cargar.
+    reload = set()
+
+    try:
+        for table, path in files:
+            progress.current_file = str(path)
+            rows = await ingest_file(
+                table,
+                path,
+                progress,
+                batch_size,
+                encoding,
+                validators[table],
+                seed_on_skip=table in several,
+                force=table in reload,
+            )
+            progress.files_done += 1
+            if rows is None:
+                progress.files_skipped += 1
+            elif SCHEMAS[table].newest_by:
+                reload.add(table)
+    except Exception as e:
+        progress.status = "failed"
+        progress.error = str(e)
+        logger.exception("Falló la ingesta de %s", progress.current_file)
+        raise
+    finally:
+        for table, validator in validators.items():
+            progress.quality[table] = validator.finish().as_dict()
+        progress.finished_at = time.time()
+        progress.current_file = None
+
+    progress.status = "done"
+    logger.info(
+        "Ingesta terminada: %d archivos (%d sin cambios), %d filas, "
+        "%d en cuarentena, %.0f filas/s",
+        progress.files_done,
+        progress.files_skipped,
+        progress.rows,
+        progress.rejected,
+        progress.rows_per_second,
+    )
+    return progress
+
+
+# Tareas de los trabajos lanzados desde este worker; el estado está en la base.
+_tasks: set[asyncio.Task] = set()
+
+
+def _job_dict(job: dict[str, Any]) -> dict[str, Any]:
+    def iso(value: datetime | None) -> str | None:
+        return value.isoformat() if value else None
+
+    return {
+        **(job["progress"] or {}),
+        "id": job["id"],
+        "tables": job["tables"],
+        "status": job["status"],
+        "error": job["error"],
+        "started_at": iso(job["started_at"]),
+        "heartbeat_at": iso(job["heartbeat_at"]),
+        "finished_at": iso(job["finished_at"]),
+    }
+
+
+async def _save_job(progress: IngestionProgress, finished: bool = False) -> None:
+    values: dict[str, Any] = {
+        "progress": progress.as_dict(),
+        "heartbeat_at": func.now(),
+    }
+    if finished:
+        values.update(
+            status=progress.status, error=progress.error, finished_at=func.now()
+        )
+    await execute(
+        update(ingestion_job).where(ingestion_job.c.id == progress.id).values(**values),
+        commit_after=True,
+    )
+
+
+async def _heartbeat(progress: IngestionProgress) -> None:
+    while True:
+        await asyncio.sleep(PROGRESS_INTERVAL)
+        try:
+            await _save_job(progress)
+        except Exception:
+            logger.warning("No se pudo guardar el progreso de %s", progress.id)
+
+
+async def _run_job(progress: IngestionProgress, batch_size: int) -> None:
+    heartbeat = asyncio.create_task(_heartbeat(progress))
+    try:
+        await ingest_tables(progress.tables, batch_size, progress=progress)
+    except Exception:
+        pass  # ya registrado en progress y en el log
+    finally:
+        heartbeat.cancel()
+        if progress.status not in ("done", "failed"):
+            progress.status = "failed"
+            progress.error = "Interrumpida al detener el worker"
+        await _save_job(progress, finished=True)
+
+
+async def start_ingestion_job(
+    tables: list[str], batch_size: int = 5_000
+) -> dict[str, Any]:
+    """Lanza la ingesta en este worker, o devuelve el trabajo en curso.
+
+    El trabajo en curso puede ser de cualquier worker: un índice único parcial
+    admite un solo trabajo "running" en la base.
+    """
+    progress = IngestionProgress(tables=list(tables), status="running")
+    async with engine.begin() as connection:
+        # Sin latido reciente, el trabajo murió con su worker y deja de bloquear.
+        await connection.execute(
+            update(ingestion_job)
+            .where(
+                ingestion_job.c.status == "running",
+                ingestion_job.c.heartbeat_at < func.now() - JOB_STALE_AFTER,
+            )
+            .values(
+                status="failed",
+                error="Sin latido: el worker se detuvo",
+                finished_at=func.now(),
+            )
+        )
+        created = (
+            await connection.execute(
+                pg_insert(ingestion_job)
+                .values(
+                    id=progress.id,
+                    status=progress.status,
+                    tables=progress.tables,
+                    progress=progress.as_dict(),
+                )
+                .on_conflict_do_nothing()
+                .returning(*ingestion_job.c)
+            )
+        ).first()
+        if created is None:
+            running = await connection.execute(
+                select(ingestion_job).where(ingestion_job.c.status == "running")
+            )
+            return _job_dict(running.one()._asdict())
+
+    task = asyncio.create_task(_run_job(progress, batch_size))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return _job_dict(created._asdict())
+
+
+async def get_ingestion_job(job_id: str) -> dict[str, Any] | None:
+    job = await fetch_one(select(ingestion_job).where(ingestion_job.c.id == job_id))
+    return _job_dict(job) if job else None
+
+
+async def list_ingestion_jobs(limit: int = 50) -> list[dict[str, Any]]:
+    jobs = await fetch_all(
+        select(ingestion_job).order_by(ingestion_job.c.started_at.desc()).limit(limit)
+    )
+    return [_job_dict(job) for job in jobs]
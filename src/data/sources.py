@@ -0,0 +1,71 @@
+"""Tablas DBF del sistema de farmacia: archivos de origen, CSV y campos exportados.
+
+Sin dependencias (ni dbfread ni pandas): la API lo importa al arrancar.
+"""
+
+from pathlib import Path
+
+campos_tformdet = [
+    "CODIGO_EJE",
+    "CODIGO_PRE",
+    "TIPSUM",
+    "ANNOMES",
+    "CODIGO_MED",
+    "PRECIO",
+    "INGRE",
+    "VENTA",
+    "SIS",
+    "INTERSAN",
+    "STOCK_FIN",
+    "FEC_EXP",
+    "MEDLOTE",
+    "MEDREGSAN",
+]
+campos_mstockalm = [
+    "ALMCOD",
+    "MEDCOD",
+    "STKSALDO",
+    "STKPRECIO",
+    "STKFECHULT",
+    "FLG_SOCKET",
+]
+campos_mproducto = [
+    "MEDCOD",
+    "MEDNOM",
+    "MEDPRES",
+    "MEDCNC",
+    "MEDTIP",
+    "MEDPET",
+    "MEDFF",
+    "MEDEST",
+    "MEDREGSAN",
+    "ESTADO",
+]
+
+CURRENT_DIR = Path(__file__).resolve().parent
+DBF_DIR = CURRENT_DIR / "dbf"
+
+TFORMDET_DBF = CURRENT_DIR / "dbf" / "TFORMDET.DBF"
+TFORMDET_CSV = CURRENT_DIR / "tformdet.csv"
+MUSUARIO_DBF = CURRENT_DIR / "dbf" / "MUSUARIO.DBF"
+MUSUARIO_CSV = CURRENT_DIR / "usuario.csv"
+MPRODUCTO_DBF = CURRENT_DIR / "dbf" / "MPRODUCTO.DBF"
+MPRODUCTO_CSV = CURRENT_DIR / "mproducto.csv"
+MSTOCK_DBF = CURRENT_DIR / "dbf" / "MSTOCKALM.DBF"
+MSTOCK_CSV = CURRENT_DIR / "mstockalm.csv"
+
+# tabla -> (nombre del DBF, CSV de salida, campos exportados al CSV)
+SOURCES = {
+    "tformdet": ("TFORMDET.DBF", TFORMDET_CSV, campos_tformdet),
+    "mstockalm": ("MSTOCKALM.DBF", MSTOCK_CSV, campos_mstockalm),
+    "mproducto": ("MPRODUCTO.DBF", MPRODUCTO_CSV, None),
+}
+
+
+def find_dbf_files(dbf_name: str, dbf_dir: Path = DBF_DIR) -> list[Path]:
+    """DBF por año (dbf/2021/TFORMDET.DBF, ...) o, si no hay, dbf/TFORMDET.DBF."""
+    yearly = sorted(p for p in dbf_dir.glob(f"*/{dbf_name}") if p.parent.name.isdigit())
+    if yearly:
+        return yearly
+    single = dbf_dir / dbf_name
+    return [single] if single.exists() else []
@@ -0,0 +1,397 @@
+"""Validación de calidad de los datos de los DBF, por lotes y vectorizada.
+
+Cada lote (un DataFrame con los registros tal como vienen del DBF o del CSV) se
+revisa contra el esquema de su tabla: columnas presentes, tipos, nulos en
+columnas obligatorias, cantidades negativas, ANNOMES fuera de rango y claves
+duplicadas (también entre lotes y archivos de una misma ejecución). Las filas
+válidas salen con sus tipos ya convertidos; las demás van a un CSV de cuarentena
+con el motivo, y al terminar se escribe un reporte JSON por tabla.
+
+La cuarentena se escribe al confirmar (`commit`) cada archivo, después de que
+sus datos se hayan guardado: si la carga falla, `rollback` la descarta.
+"""
+
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src import metrics
+from src.config import settings
+
+logger = logging.getLogger(__name__)
+
+REASON_COLUMN = "_MOTIVO"
+# Prefijo del motivo de las filas que se conservan pero se copian a la cuarentena.
+REVIEW = "revisar_duplicado_sin"
+# Años admitidos en ANNOMES: desde MIN_YEAR hasta el año siguiente al actual.
+MIN_YEAR = 2000
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    # columna -> "int", "float", "str", "date", "datetime" o "annomes". Los
+    # códigos (CODIGO_MED, MEDCOD, ...) son "str": "00946" no es 946.
+    columns: dict[str, str]
+    required: tuple[str, ...] = ()
+    # Claves únicas; vacío = la fila completa (duplicados exactos). Se conserva
+    # la primera aparición.
+    key: tuple[str, ...] = ()
+    non_negative: tuple[str, ...] = ()
+    # Un duplicado con alguna de estas columnas vacía no se descarta: sin ellas
+    # las filas no se distinguen (p. ej. dos lotes sin número con el mismo
+    # stock). Se conserva y se copia a la cuarentena para revisarlo.
+    review_duplicates_without: tuple[str, ...] = ()
+    # Columna de fecha que decide qué versión de una clave se conserva: la más
+    # reciente. Los archivos por año se validan del más nuevo al más antiguo y,
+    # al cargar un CSV con varios años, las filas se ordenan por esta fecha.
+    newest_by: str | None = None
+
+
+SCHEMAS: dict[str, TableSchema] = {
+    "tformdet": TableSchema(
+        columns={
+            "CODIGO_EJE": "str",
+            "CODIGO_PRE": "str",
+            "TIPSUM": "str",
+            "ANNOMES": "annomes",
+            "CODIGO_MED": "str",
+            "PRECIO": "float",
+            "INGRE": "float",
+            "VENTA": "float",
+            "SIS": "float",
+            "INTERSAN": "float",
+            "STOCK_FIN": "int",
+            "FEC_EXP": "date",
+            "MEDLOTE": "str",
+            "MEDREGSAN": "str",
+        },
+        required=("ANNOMES", "CODIGO_MED", "STOCK_FIN"),
+        non_negative=("PRECIO", "INGRE", "VENTA", "SIS", "INTERSAN", "STOCK_FIN"),
+        review_duplicates_without=("MEDLOTE",),
+    ),
+    "mstockalm": TableSchema(
+        columns={
+            "ALMCOD": "str",
+            "MEDCOD": "str",
+            "STKSALDO": "int",
+            "STKPRECIO": "float",
+            "STKFECHULT": "datetime",
+            "FLG_SOCKET": "int",
+        },
+        required=("ALMCOD", "MEDCOD", "STKSALDO"),
+        key=("ALMCOD", "MEDCOD", "STKFECHULT"),
+        non_negative=("STKSALDO", "STKPRECIO"),
+    ),
+    "mproducto": TableSchema(
+        columns={
+            "MEDCOD": "str",
+            "MEDNOM": "str",
+            "MEDPRES": "str",
+            "MEDCNC": "str",
+            "MEDTIP": "str",
+            "MEDPET": "str",
+            "MEDFF": "str",
+            "MEDEST": "str",
+            "MEDREGSAN": "str",
+            "ESTADO": "str",
+        },
+        required=("MEDCOD",),
+        key=("MEDCOD",),
+        # El maestro de productos se exporta cada año: vale la ficha con la
+        # última actualización (PRDFECHULT) más reciente.
+        newest_by="PRDFECHULT",
+    ),
+}
+
+
+@dataclass
+class QualityReport:
+    table: str
+    rows: int = 0
+    valid: int = 0
+    rejected: int = 0
+    # Filas válidas copiadas a la cuarentena para revisión (no se descartan).
+    flagged: int = 0
+    reasons: dict[str, int] = field(default_factory=dict)
+    missing_columns: list[str] = field(default_factory=list)
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "table": self.table,
+            "rows": self.rows,
+            "valid": self.valid,
+            "rejected": self.rejected,
+            "flagged": self.flagged,
+            "reasons": dict(sorted(self.reasons.items())),
+            "missing_columns": self.missing_columns,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(),
+            "finished_at": (
+                datetime.fromtimestamp(self.finished_at).isoformat()
+                if self.finished_at
+                else None
+            ),
+        }
+
+
+def _blank(raw: pd.Series) -> pd.Series:
+    return raw.isna() | raw.astype("string").str.strip().eq("").fillna(True)
+
+
+def _coerce(raw: pd.Series, kind: str) -> pd.Series:
+    """Convierte `raw` al tipo del esquema; lo que no se puede convertir queda nulo."""
+    if kind in ("int", "annomes"):
+        numbers = pd.to_numeric(raw, errors="coerce")
+        return numbers.where(numbers % 1 == 0).astype("Int64")
+    if kind == "float":
+        # Siempre float64, aunque el lote solo traiga valores enteros.
+        return pd.to_numeric(raw, errors="coerce").astype("float64")
+    if kind in ("date", "datetime"):
+        # str() de date/datetime (lo que entrega dbfread) ya es ISO 8601.
+        parsed = pd.to_datetime(raw.astype("string"), errors="coerce", format="ISO8601")
+        return parsed.dt.normalize() if kind == "date" else parsed
+    text = raw.astype("string").str.strip()
+    return text.mask(text == "")
+
+
+def validation_order(table: str, paths: list[Path]) -> list[Path]:
+    """Archivos de `table` (ordenados por año) en el orden en que se validan."""
+    return paths[::-1] if SCHEMAS[table].newest_by else list(paths)
+
+
+def newest_first(frame: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Filas de `frame` de la más reciente a la más antigua según `newest_by`.
+
+    Para un CSV con varios años de una tabla: la primera aparición de cada clave,
+    la que conserva la validación, pasa a ser la más nueva. Las filas sin fecha
+    van al final (solo se conservan si no hay otra versión).
+    """
+    column = SCHEMAS[table].newest_by
+    if column not in frame.columns:
+        return frame
+    updated = pd.to_datetime(frame[column], errors="coerce", format="ISO8601")
+    order = updated.reset_index(drop=True).sort_values(ascending=False, kind="stable")
+    return frame.iloc[order.index]
+
+
+class Validator:
+    """Valida los lotes de una tabla durante una ejecución de ingesta.
+
+    Las filas para la cuarentena quedan pendientes hasta `commit`; `rollback`
+    las descarta junto con lo que el archivo sumó al reporte y a las claves.
+    """
+
+    def __init__(self, table: str, quarantine_dir: Path | None = None) -> None:
+        self.schema = SCHEMAS[table]
+        self.report = QualityReport(table)
+        self.quarantine_dir = quarantine_dir or settings.QUARANTINE_DIR
+        self.quarantine_path = self.quarantine_dir / f"{table}.csv"
+        self._seen = np.empty(0, dtype=np.uint64)
+        self._quarantine_started = False
+        self._pending: list[pd.DataFrame] = []
+        self._checkpoint = self._state()
+
+    def validate(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Filas válidas de `frame` con los tipos del esquema; el resto a cuarentena."""
+        frame, typed, reasons = self._check(frame)
+        rejected = reasons != ""
+        flagged = _reviewed(reasons)
+        rejected &= ~flagged
+        self._quarantine(frame[rejected | flagged], reasons[rejected | flagged])
+        self.report.rows += len(frame)
+        self.report.valid += int((~rejected).sum())
+        self.report.rejected += int(rejected.sum())
+        self.report.flagged += int(flagged.sum())
+        return typed[~rejected].reset_index(drop=True)
+
+    def seed(self, frame: pd.DataFrame) -> None:
+        """Registra las claves de las filas válidas de `frame`, sin cuarentena ni
+        reporte: las de un archivo ya cargado que la ejecución no vuelve a escribir.
+        """
+        self._check(frame)
+
+    def _check(
+        self, frame: pd.DataFrame
+    ) -> tuple[pd.DataFrame, pd.DataFrame, np.ndarray]:
+        """(frame, frame con tipos, motivo de rechazo de cada fila o "")."""
+        schema = self.schema
+        missing = [col for col in schema.columns if col not in frame.columns]
+        if missing:
+            self.report.missing_columns = missing
+            raise ValueError(
+                f"Faltan columnas en {self.report.table}: {', '.join(missing)}"
+            )
+
+        frame = frame.reset_index(drop=True)
+        typed = frame.copy()
+        # Primer motivo de rechazo de cada fila ("" = válida).
+        reasons = np.full(len(frame), "", dtype=object)
+
+        def flag(mask: Any, reason: str) -> None:
+            mask = np.asarray(mask, dtype=bool) & (reasons == "")
+            reasons[mask] = reason
+
+        for col, kind in schema.columns.items():
+            blank = _blank(frame[col])
+            values = _coerce(frame[col], kind)
+            if col in schema.required:
+                flag(blank, f"nulo:{col}")
+            flag(values.isna() & ~blank, f"tipo_invalido:{col}")
+            if kind == "annomes":
+                year, month = values // 100, values % 100
+                in_range = (
+                    (year >= MIN_YEAR)
+                    & (year <= date.today().year + 1)
+                    & (month >= 1)
+                    & (month <= 12)
+                )
+                flag(~in_range.fillna(True), f"fuera_de_rango:{col}")
+            typed[col] = values
+
+        for col in schema.non_negative:
+            flag((typed[col] < 0).fillna(False), f"negativo:{col}")
+
+        # Duplicados contra las filas válidas ya vistas (este lote y los anteriores).
+        key = list(schema.key or schema.columns)
+        candidates = np.flatnonzero(reasons == "")
+        hashes = pd.util.hash_pandas_object(
+            typed.loc[candidates, key], index=False
+        ).to_numpy()
+        duplicated = pd.Series(hashes).duplicated().to_numpy() | np.isin(
+            hashes, self._seen
+        )
+        is_duplicate = np.zeros(len(frame), dtype=bool)
+        is_duplicate[candidates[duplicated]] = True
+        for col in schema.review_duplicates_without:
+            flag(is_duplicate & typed[col].isna().to_numpy(), f"{REVIEW}:{col}")
+        flag(is_duplicate, "clave_duplicada")
+        self._seen = np.concatenate([self._seen, hashes[~duplicated]])
+        return frame, typed, reasons
+
+    def _quarantine(self, rows: pd.DataFrame, reasons: np.ndarray) -> None:
+        if rows.empty:
+            return
+        for reason, count in pd.Series(reasons).value_counts().items():
+            self.report.reasons[reason] = self.report.reasons.get(reason, 0) + count
+        self._pending.append(rows.assign(**{REASON_COLUMN: reasons}))
+
+    def _state(self) -> tuple:
+        report = self.report
+        return (
+            report.rows,
+            report.valid,
+            report.rejected,
+            report.flagged,
+            dict(report.reasons),
+            len(self._seen),
+        )
+
+    def commit(self) -> None:
+        """Escribe la cuarentena pendiente: los datos del archivo ya se guardaron."""
+        if self._pending:
+            rows = pd.concat(self._pending, ignore_index=True)
+            for reason, count in rows[REASON_COLUMN].value_counts().items():
+                if not reason.startswith(REVIEW):
+                    metrics.DBF_REJECTED_ROWS.labels(
+                        table=self.report.table, reason=reason.split(":")[0]
+                    ).inc(count)
+            self.quarantine_dir.mkdir(parents=True, exist_ok=True)
+            rows.to_csv(
+                self.quarantine_path,
+                mode="a" if self._quarantine_started else "w",
+                header=not self._quarantine_started,
+                index=False,
+            )
+            self._quarantine_started = True
+            self._pending = []
+        self._checkpoint = self._state()
+
+    def rollback(self) -> None:
+        """Descarta lo validado desde el último `commit` (el archivo no se guardó)."""
+        self._pending = []
+        rows, valid, rejected, flagged, reasons, seen = self._checkpoint
+        self.report.rows, self.report.valid = rows, valid
+        self.report.rejected, self.report.flagged = rejected, flagged
+        self.report.reasons = dict(reasons)
+        self._seen = self._seen[:seen]
+
+    def finish(self) -> QualityReport:
+        """Cierra la ejecución y escribe el reporte junto al CSV de cuarentena.
+
+        Lo validado sin `commit` (un archivo que no llegó a guardarse) no cuenta.
+        """
+        self.rollback()
+        report = self.report
+        report.finished_at = time.time()
+        self.quarantine_dir.mkdir(parents=True, exist_ok=True)
+        (self.quarantine_dir / f"{report.table}.report.json").write_text(
+            json.dumps(report.as_dict(), indent=2)
+        )
+        if not self._quarantine_started:
+            self.quarantine_path.unlink(missing_ok=True)
+        logger.info(
+            "Calidad %s: %d filas, %d válidas, %d en cuarentena, %d a revisar %s",
+            report.table,
+            report.rows,
+            report.valid,
+            report.rejected,
+            report.flagged,
+            report.reasons or "",
+        )
+        return report
+
+
+def _reviewed(reasons: np.ndarray) -> np.ndarray:
+    return pd.Series(reasons, dtype=object).str.startswith(REVIEW).to_numpy(bool)
+
+
+def analysis_frame(frame: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Filas válidas de un CSV ya exportado, con tipos de numpy para el análisis.
+
+    Se usa al cargar los CSV en la API: valida igual que la ingesta pero no
+    escribe cuarentena (solo avisa en el log). `frame` debe leerse con dtype=str
+    para conservar los ceros a la izquierda de los códigos. Los enteros quedan
+    int64 (float si tienen vacíos), el texto como object y las fechas datetime64.
+    """
+    validator = Validator(table)
+    valid = validator.validate(newest_first(frame, table))
+    report = validator.report
+    if report.rejected or report.flagged:
+        logger.warning(
+            "%s: %d filas descartadas y %d a revisar al cargar %s",
+            table,
+            report.rejected,
+            report.flagged,
+            report.reasons,
+        )
+    for col, kind in SCHEMAS[table].columns.items():
+        values = valid[col]
+        if kind in ("int", "annomes"):
+            valid[col] = values.astype("float64" if values.hasnans else "int64")
+        elif kind == "str":
+            valid[col] = values.astype(object).where(values.notna(), np.nan)
+    return valid
+
+
+def to_csv_frame(frame: pd.DataFrame, table: str) -> pd.DataFrame:
+    """Fechas de un lote validado como texto ISO para escribirlas en el CSV."""
+    frame = frame.copy()
+    for col, kind in SCHEMAS[table].columns.items():
+        if kind == "date":
+            frame[col] = frame[col].dt.strftime("%Y-%m-%d")
+        elif kind == "datetime":
+            frame[col] = frame[col].dt.strftime("%Y-%m-%d %H:%M:%S")
+    return frame
+
+
+def to_records(frame: pd.DataFrame) -> list[dict[str, Any]]:
+    """Filas de un lote validado como dicts con None en lugar de NA/NaT."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
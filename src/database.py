@@ -1,11 +1,26 @@
 from typing import Any
 
 from sqlalchemy import (
+    JSON,
+    Column,
     CursorResult,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Identity,
+    Index,
     Insert,
+    Integer,
     MetaData,
     Select,
+    String,
+    Table,
+    Text,
+    UniqueConstraint,
     Update,
+    func,
+    text,
 )
 from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
 
@@ -22,6 +37,106 @@ engine = create_async_engine(
 )
 metadata = MetaData(naming_convention=DB_NAMING_CONVENTION)
 
+dbf_ingestion = Table(
+    "dbf_ingestion",
+    metadata,
+    Column("id", Integer, Identity(), primary_key=True),
+    Column("table_name", String, nullable=False),
+    Column("source_path", String, nullable=False),
+    Column("checksum", String, nullable=False),
+    Column("rows", Integer, nullable=False, server_default="0"),
+    Column("started_at", DateTime, server_default=func.now(), nullable=False),
+    Column("finished_at", DateTime),
+    UniqueConstraint("table_name", "source_path"),
+)
+
+# Trabajos de ingesta lanzados desde la API, visibles desde todos los workers.
+ingestion_job = Table(
+    "ingestion_job",
+    metadata,
+    Column("id", String, primary_key=True),
+    Column("status", String, nullable=False),
+    Column("tables", JSON, nullable=False),
+    Column("progress", JSON),
+    Column("error", Text),
+    Column("started_at", DateTime, server_default=func.now(), nullable=False),
+    Column("heartbeat_at", DateTime, server_default=func.now(), nullable=False),
+    Column("finished_at", DateTime),
+    # A lo sumo un trabajo en curso.
+    Index(
+        "ingestion_job_running_key",
+        "status",
+        unique=True,
+        postgresql_where=text("status = 'running'"),
+    ),
+)
+
+tformdet = Table(
+    "tformdet",
+    metadata,
+    Column("id", Integer, Identity(), primary_key=True),
+    Column(
+        "ingestion_id",
+        ForeignKey("dbf_ingestion.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    ),
+    Column("codigo_eje", Text),
+    Column("codigo_pre", Text),
+    Column("tipsum", Text),
+    Column("annomes", Integer, index=True),
+    Column("codigo_med", Text, index=True),
+    Column("precio", Float),
+    Column("ingre", Float),
+    Column("venta", Float),
+    Column("sis", Float),
+    Column("intersan", Float),
+    Column("stock_fin", Float),
+    Column("fec_exp", Date),
+    Column("medlote", Text),
+    Column("medregsan", Text),
+)
+
+mstockalm = Table(
+    "mstockalm",
+    metadata,
+    Column("id", Integer, Identity(), primary_key=True),
+    Column(
+        "ingestion_id",
+        ForeignKey("dbf_ingestion.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    ),
+    Column("almcod", Text),
+    Column("medcod", Text, index=True),
+    Column("stksaldo", Float),
+    Column("stkprecio", Float),
+    Column("stkfechult", DateTime),
+    Column("flg_socket", Text),
+)
+
+mproducto = Table(
+    "mproducto",
+    metadata,
+    Column("id", Integer, Identity(), primary_key=True),
+    Column(
+        "ingestion_id",
+        ForeignKey("dbf_ingestion.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    ),
+    Column("medcod", Text, index=True),
+    Column("mednom", Text),
+    Column("medpres", Text),
+    Column("medcnc", Text),
+    Column("medtip", Text),
+    Column("medpet", Text),
+    Column("medff", Text),
+    Column("medest", Text),
+    Column("medregsan", Text),
+    Column("estado", Text),
+)
+
 
 async def fetch_one(
     select_query: Select | Insert | Update,
@@ -7,8 +7,15 @@ class DetailedHTTPException(HTTPException):
     STATUS_CODE = status.HTTP_500_INTERNAL_SERVER_ERROR
     DETAIL = "Server error"
 
-    def __init__(self, **kwargs: dict[str, Any]) -> None:
-        super().__init__(status_code=self.STATUS_CODE, detail=self.DETAIL, **kwargs)
+    def __init__(self, detail: Any = None, **kwargs: dict[str, Any]) -> None:
+        super().__init__(
+            status_code=self.STATUS_CODE, detail=detail or self.DETAIL, **kwargs
+        )
+
+
+class NotModified(DetailedHTTPException):
+    STATUS_CODE = status.HTTP_304_NOT_MODIFIED
+    DETAIL = "Not modified"
 
 
 class PermissionDenied(DetailedHTTPException):
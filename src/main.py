@@ -1,17 +1,54 @@
+import asyncio
+import logging
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator, Callable
 
-import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
+
+from src import IMPORT_STARTED
+from src.analytics import pool, warmup
 from src.api.routes import api_router
 from src.config import app_configs, settings
+from src.metrics import PrometheusMiddleware, metrics_response
+from src.profiling import ProfileStore, ProfilingMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+def _record_failure(task: asyncio.Task) -> None:
+    if task.cancelled() or task.exception() is None:
+        return
+    logger.error(
+        "Falló la tarea de arranque %s", task.get_name(), exc_info=task.exception()
+    )
+    warmup.state.fail(task.get_name(), task.exception())
+
+
+def _start_in_thread(name: str, func: Callable[[], Any]) -> asyncio.Task:
+    task = asyncio.create_task(asyncio.to_thread(func), name=name)
+    task.add_done_callback(_record_failure)
+    return task
+
 
 @asynccontextmanager
-async def lifespan(_application: FastAPI) -> AsyncGenerator:
+async def lifespan(application: FastAPI) -> AsyncGenerator:
     # Startup
+    warmup.state.record_boot(time.perf_counter() - IMPORT_STARTED)
+    application.state.startup_tasks = [
+        # En segundo plano: /readiness responde 503 hasta que termine.
+        _start_in_thread("warmup", warmup.warm_up),
+        # Los procesos del pool arrancan por worker (no en el master de gunicorn).
+        _start_in_thread("pool", pool.prestart),
+    ]
     yield
     # Shutdown
+    for task in application.state.startup_tasks:
+        task.cancel()
+    await asyncio.gather(*application.state.startup_tasks, return_exceptions=True)
+    pool.shutdown_pool()
 
 
 app = FastAPI(**app_configs, lifespan=lifespan)
@@ -26,8 +63,23 @@ app.add_middleware(
     allow_methods=("GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"),
     allow_headers=settings.CORS_HEADERS,
 )
+app.add_middleware(
+    PrometheusMiddleware, exclude_paths=("/metrics", "/healthcheck", "/readiness")
+)
+
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES),
+        threshold=settings.PROFILING_THRESHOLD_MS / 1000,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        interval=settings.PROFILING_INTERVAL_MS / 1000,
+        exclude_prefixes=("/metrics", "/healthcheck", "/readiness", "/api/debug"),
+    )
 
 if settings.ENVIRONMENT.is_deployed:
+    import sentry_sdk
+
     sentry_sdk.init(
         dsn=settings.SENTRY_DSN,
         environment=settings.ENVIRONMENT,
@@ -37,3 +89,14 @@ if settings.ENVIRONMENT.is_deployed:
 @app.get("/healthcheck", include_in_schema=False)
 async def healthcheck() -> dict[str, str]:
     return {"status": "ok"}
+
+
+@app.get("/readiness", include_in_schema=False)
+async def readiness() -> JSONResponse:
+    status_code = 200 if warmup.state.healthy else 503
+    return JSONResponse(warmup.state.as_dict(), status_code=status_code)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return metrics_response()
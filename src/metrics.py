@@ -0,0 +1,140 @@
+import os
+import time
+from typing import Any
+
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:  # prometheus-client solo se instala con el grupo prod
+    CollectorRegistry = None
+
+
+class _NoopMetric:
+    def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+        return self
+
+    def observe(self, amount: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+
+if CollectorRegistry is not None:
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds",
+        "Latencia de las peticiones HTTP por ruta",
+        ["method", "route", "status"],
+        buckets=LATENCY_BUCKETS,
+    )
+    RESPONSE_BYTES = Histogram(
+        "http_response_size_bytes",
+        "Tamaño del cuerpo de la respuesta HTTP por ruta",
+        ["method", "route"],
+        buckets=SIZE_BUCKETS,
+    )
+    SUMMARY_STAGE_LATENCY = Histogram(
+        "summary_stage_duration_seconds",
+        "Duración de cada etapa de get_summary",
+        ["stage"],
+        buckets=STAGE_BUCKETS,
+    )
+    SUMMARY_ROWS = Counter(
+        "summary_rows_processed_total",
+        "Filas leídas de tformdet (input) y devueltas (output) por get_summary",
+        ["kind"],
+    )
+    DATASET_CACHE = Counter(
+        "dataset_cache_requests_total",
+        "Consultas a la caché en memoria de datasets e índices",
+        ["dataset", "result"],
+    )
+    DBF_INGEST_LATENCY = Histogram(
+        "dbf_ingestion_duration_seconds",
+        "Duración de una ingesta de DBF",
+        ["table"],
+        buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600),
+    )
+    DBF_INGEST_ROWS = Counter(
+        "dbf_ingestion_rows_total",
+        "Filas leídas de los DBF",
+        ["table"],
+    )
+    DBF_REJECTED_ROWS = Counter(
+        "dbf_ingestion_rejected_rows_total",
+        "Filas en cuarentena por la validación de calidad de la ingesta",
+        ["table", "reason"],
+    )
+else:
+    REQUEST_LATENCY = RESPONSE_BYTES = SUMMARY_STAGE_LATENCY = _NoopMetric()
+    SUMMARY_ROWS = DATASET_CACHE = _NoopMetric()
+    DBF_INGEST_LATENCY = DBF_INGEST_ROWS = DBF_REJECTED_ROWS = _NoopMetric()
+
+
+def observe_summary_stage(stage: str, seconds: float) -> None:
+    SUMMARY_STAGE_LATENCY.labels(stage=stage).observe(seconds)
+
+
+def metrics_response() -> Response:
+    """Exposición de métricas; en modo multiproceso suma todos los workers."""
+    if CollectorRegistry is None:
+        return Response("prometheus-client no está instalado", status_code=501)
+
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+class PrometheusMiddleware:
+    """Latencia y tamaño de respuesta por plantilla de ruta (/api/data/summary)."""
+
+    def __init__(self, app: ASGIApp, exclude_paths: tuple[str, ...] = ()) -> None:
+        self.app = app
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        body_bytes = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, body_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                body_bytes += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # La plantilla de la ruta evita una serie por cada valor de path param.
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            REQUEST_LATENCY.labels(
+                method=method, route=route_path, status=str(status_code)
+            ).observe(elapsed)
+            RESPONSE_BYTES.labels(method=method, route=route_path).observe(body_bytes)
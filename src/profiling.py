@@ -0,0 +1,270 @@
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter
+from contextvars import ContextVar
+from pathlib import Path
+from types import FrameType
+from typing import Any
+from urllib.parse import parse_qsl
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Una petición se perfila si lo pide con la cabecera o con el parámetro de query.
+PROFILE_HEADER = b"x-profile"
+PROFILE_PARAM = "profile"
+_TRUE_VALUES = ("1", "true", "yes")
+
+
+class RequestProfile:
+    def __init__(self) -> None:
+        self.stacks: Counter[str] = Counter()
+
+
+# Perfil de la petición en curso; las tareas creadas durante la petición lo
+# heredan con el contexto y el sampler las atribuye a la misma petición.
+_current_profile: ContextVar[RequestProfile | None] = ContextVar(
+    "request_profile", default=None
+)
+
+
+def _fold(frame: FrameType | None) -> str:
+    """Stack colapsado (raíz primero), el formato de flamegraph.pl/speedscope."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(
+            f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Un solo hilo que muestrea el event loop mientras haya peticiones perfiladas.
+
+    Cada muestra es el stack del hilo del loop y se atribuye a la petición dueña
+    de la tarea que se está ejecutando en ese momento (la tarea de la petición o
+    una creada desde ella), así las peticiones concurrentes no se mezclan. El
+    trabajo enviado a otros hilos (run_in_threadpool) no se muestrea.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._tasks: dict[asyncio.Task, RequestProfile] = {}
+        # loop -> id del hilo que lo ejecuta
+        self._loops: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, int] = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self, profile: RequestProfile) -> None:
+        """Empieza a muestrear la tarea actual (desde la propia petición)."""
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        with self._lock:
+            if loop not in self._loops:
+                self._loops[loop] = threading.get_ident()
+                self._install_task_factory(loop)
+            if task is not None:
+                self._tasks[task] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="request-profiler", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, profile: RequestProfile) -> None:
+        with self._lock:
+            for task in [t for t, p in self._tasks.items() if p is profile]:
+                del self._tasks[task]
+
+    def _install_task_factory(self, loop: asyncio.AbstractEventLoop) -> None:
+        previous = loop.get_task_factory()
+
+        def task_factory(
+            loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any
+        ) -> asyncio.Future:
+            if previous is None:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            else:
+                task = previous(loop, coro, **kwargs)
+            profile = _current_profile.get()
+            if profile is not None:
+                with self._lock:
+                    self._tasks[task] = profile
+                task.add_done_callback(self._forget)
+            return task
+
+        loop.set_task_factory(task_factory)
+
+    def _forget(self, task: asyncio.Future) -> None:
+        with self._lock:
+            self._tasks.pop(task, None)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                if not self._tasks:
+                    self._wakeup.clear()
+                    continue
+                loops = list(self._loops.items())
+            for loop, thread_id in loops:
+                task = asyncio.current_task(loop)
+                profile = self._tasks.get(task) if task is not None else None
+                if profile is None:
+                    continue
+                frame = sys._current_frames().get(thread_id)
+                # Si el loop cambió de tarea mientras tanto, el stack es de otra.
+                if frame is not None and asyncio.current_task(loop) is task:
+                    profile.stacks[_fold(frame)] += 1
+                del frame
+            time.sleep(self.interval)
+
+
+class ProfileStore:
+    """Perfiles en disco compartidos por los workers: <id>.json + <id>.folded."""
+
+    def __init__(self, directory: Path, max_profiles: int) -> None:
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, meta: dict[str, Any], stacks: Counter[str]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        folded = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        (self.directory / f"{meta['id']}.folded").write_text(folded + "\n")
+        (self.directory / f"{meta['id']}.json").write_text(json.dumps(meta))
+        self._prune()
+
+    def list(self) -> list[dict[str, Any]]:
+        if not self.directory.exists():
+            return []
+        profiles = []
+        for path in self.directory.glob("*.json"):
+            try:
+                profiles.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # borrado o escrito a medias por otro worker
+        return sorted(profiles, key=lambda meta: meta["timestamp"], reverse=True)
+
+    def get(self, profile_id: str) -> dict[str, Any] | None:
+        path = self.directory / f"{profile_id}.json"
+        if not profile_id.isalnum() or not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def get_folded(self, profile_id: str) -> str | None:
+        path = self.directory / f"{profile_id}.folded"
+        if not profile_id.isalnum() or not path.exists():
+            return None
+        return path.read_text()
+
+    def _prune(self) -> None:
+        metas = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in metas[: max(len(metas) - self.max_profiles, 0)]:
+            path.unlink(missing_ok=True)
+            path.with_suffix(".folded").unlink(missing_ok=True)
+
+
+def _query_params(scope: Scope) -> dict[str, list[str]]:
+    params: dict[str, list[str]] = {}
+    query = scope.get("query_string", b"").decode("latin1")
+    for key, value in parse_qsl(query, keep_blank_values=True):
+        params.setdefault(key, []).append(value)
+    return params
+
+
+def profile_requested(scope: Scope) -> bool:
+    """Si la petición pide ser perfilada (X-Profile: 1 o ?profile=1)."""
+    for name, value in scope["headers"]:
+        if name.lower() == PROFILE_HEADER:
+            return value.decode("latin1").strip().lower() in _TRUE_VALUES
+    values = _query_params(scope).get(PROFILE_PARAM, [])
+    return any(value.strip().lower() in _TRUE_VALUES for value in values)
+
+
+class ProfilingMiddleware:
+    """Muestrea todas las peticiones y guarda el perfil de las que interesan.
+
+    Se guarda si la petición lo pide (cabecera X-Profile o ?profile=1), si tarda
+    al menos `threshold` segundos o si cae en la fracción `sample_rate` elegida
+    al azar. El sampler toma un solo stack por tick y por loop, así que muestrear
+    todas las peticiones en curso cuesta lo mismo que muestrear una; el perfil
+    de las demás se descarta al terminar.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        threshold: float | None = None,
+        sample_rate: float = 0.0,
+        interval: float = 0.005,
+        exclude_prefixes: tuple[str, ...] = (),
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.exclude_prefixes = exclude_prefixes
+        self.sampler = StackSampler(interval)
+
+    def _trigger(self, scope: Scope, sampled: bool, elapsed: float) -> str | None:
+        """Por qué se guarda el perfil ("requested", "slow", "sampled") o None."""
+        if profile_requested(scope):
+            return "requested"
+        if self.threshold is not None and elapsed >= self.threshold:
+            return "slow"
+        if sampled:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        sampled = random.random() < self.sample_rate
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        self.sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.sampler.stop(profile)
+            _current_profile.reset(token)
+            elapsed = time.perf_counter() - start
+            trigger = self._trigger(scope, sampled, elapsed)
+            if trigger is not None and profile.stacks:
+                meta = {
+                    "id": uuid.uuid4().hex,
+                    "timestamp": time.time(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query_params": _query_params(scope),
+                    "status": status_code,
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "samples": sum(profile.stacks.values()),
+                    "trigger": trigger,
+                }
+                # Escritura a disco fuera del event loop.
+                await run_in_threadpool(self.store.save, meta, profile.stacks)
@@ -1,97 +1,98 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-from pathlib import Path
-import csv
-
-
-DIR_PATH = Path(__file__).resolve().parent.parent
+"""Features mensuales por producto para el modelo de pronóstico.
 
+Importar el módulo no lee ningún CSV: el pipeline corre al llamar a
+`build_model_frame` o al ejecutarlo como script
+(python -m src.utils.prophet_model).
+"""
 
-dfproducto = pd.read_csv(DIR_PATH / 'data' / 'mproducto.csv')
-dfstock = pd.read_csv(DIR_PATH / 'data' / 'mstockalm.csv')
-dfformdet = pd.read_csv(DIR_PATH / 'data' / 'tformdet.csv')
+from pathlib import Path
 
-# print(dfproducto.info())
+DIR_PATH = Path(__file__).resolve().parent.parent
+DATA_DIR = DIR_PATH / "data"
 
-# estoy impiando PRODUCTO
 producto_columns = ["MEDCOD", "MEDTIP", "MEDPET", "MEDFF", "MEDEST"]
 
-# primero dropeo columnas porque tenia 2 MEDCOD y dropee la data incorrecta
-dfproducto.drop(columns=[dfproducto.columns[1], dfproducto.columns[10], dfproducto.columns[13], dfproducto.columns[22
-], dfproducto.columns[34], dfproducto.columns[36], dfproducto.columns[37], dfproducto.columns[42]], inplace=True)
-
-
-dfproducto = dfproducto[producto_columns]
-
-# print(dfproducto.info())
-
-dfproducto.fillna(0, inplace=True)
-
-# print(dfproducto.duplicated().sum())
-dfproducto.drop_duplicates(inplace=True)
-# print(dfproducto.duplicated().sum())
+campos_tformdet = [
+    "TIPSUM",
+    "ANNOMES",
+    "CODIGO_MED",
+    "PRECIO",
+    "VENTA",
+    "SIS",
+    "INTERSAN",
+    "STOCK_FIN",
+]
 
-# print(f'dfproducto: {dfproducto.info()}')
+categorical_columns = ["MEDTIP", "MEDPET", "MEDFF", "MEDEST"]
 
-# AHORA LIMPIARE TFORMDET
 
-campos_tformdet = [
-    'TIPSUM', 'ANNOMES', 'CODIGO_MED',
-    'PRECIO', 'VENTA', 'SIS', 'INTERSAN',
-    'STOCK_FIN'
-]
+def load_sources(data_dir=DATA_DIR):
+    import pandas as pd
 
-# print(f'raw data: {dfformdet.info()}')
-# print(f'duplicados: {dfformdet.duplicated().sum()}')
-dfformdet.drop_duplicates(inplace=True)
-# print(f'duplicados after drop: {dfformdet.duplicated().sum()}')
-# print(f'data restante: {dfformdet.info()}')
-dfformdet.dropna(subset=['ANNOMES', 'CODIGO_MED', 'PRECIO'], inplace=True) 
-dfformdet = dfformdet[campos_tformdet]
+    dfproducto = pd.read_csv(data_dir / "mproducto.csv")
+    dfformdet = pd.read_csv(data_dir / "tformdet.csv")
+    return dfproducto, dfformdet
 
-mean2= dfformdet['VENTA'].mean()
-mean3 = dfformdet['SIS'].mean()
-mean4 = dfformdet['INTERSAN'].mean()
-# print(mean2, mean3, mean4)
 
-dfformdet.fillna({"VENTA": round(mean2)}, inplace=True)
-dfformdet.fillna({"SIS": round(mean3)}, inplace=True)
-dfformdet.fillna({"INTERSAN": round(mean4)}, inplace=True)
+def clean_producto(dfproducto):
+    # selección por nombre: el esquema de mproducto ya se valida en la ingesta
+    # (src.data.validation), sin depender de la posición de las columnas
+    dfproducto = dfproducto[producto_columns].fillna(0)
+    return dfproducto.drop_duplicates()
 
-dfformdet['TOTAL_CONSUMO'] = dfformdet[['VENTA', 'SIS', 'INTERSAN']].sum(axis=1)
 
+def clean_tformdet(dfformdet):
+    import pandas as pd
 
-dfformdet['ds'] = pd.to_datetime(dfformdet['ANNOMES'], format='%Y%m').dt.strftime('%Y-%m')
+    dfformdet = dfformdet.drop_duplicates()
+    dfformdet = dfformdet.dropna(subset=["ANNOMES", "CODIGO_MED", "PRECIO"])
+    dfformdet = dfformdet[campos_tformdet].copy()
 
-dfformdet.sort_values(by=['CODIGO_MED', 'ds'], inplace=True)
-dfformdet = dfformdet.groupby(['CODIGO_MED', 'ds'], as_index=False).agg({
-    'PRECIO': 'last',
-    'TOTAL_CONSUMO': 'sum',
-    'STOCK_FIN': 'last',
-})
+    # los consumos faltantes se completan con la media redondeada de la columna
+    dfformdet.fillna(
+        {
+            column: round(dfformdet[column].mean())
+            for column in ["VENTA", "SIS", "INTERSAN"]
+        },
+        inplace=True,
+    )
 
-df = pd.merge(dfformdet, dfproducto, how='left', left_on='CODIGO_MED', right_on='MEDCOD')
+    dfformdet["TOTAL_CONSUMO"] = dfformdet[["VENTA", "SIS", "INTERSAN"]].sum(axis=1)
+    dfformdet["ds"] = pd.to_datetime(dfformdet["ANNOMES"], format="%Y%m").dt.strftime(
+        "%Y-%m"
+    )
 
-df.drop(columns=['MEDCOD'], inplace=True)
+    dfformdet.sort_values(by=["CODIGO_MED", "ds"], inplace=True)
+    return dfformdet.groupby(["CODIGO_MED", "ds"], as_index=False).agg(
+        {
+            "PRECIO": "last",
+            "TOTAL_CONSUMO": "sum",
+            "STOCK_FIN": "last",
+        }
+    )
 
-# print(df.tail(10))
-# print(df.info())
-# print('Luego de dropear NA vaues ')
-df.dropna(inplace=True)
-# print(df.tail(10))
-# print(df.info())
 
+def build_model_frame(dfproducto, dfformdet):
+    """Consumo mensual por producto (y) con las categorías de mproducto en one-hot."""
+    import pandas as pd
 
-dfmodel = df.rename(columns={'TOTAL_CONSUMO': 'y'})
-dfmodel = pd.get_dummies(dfmodel, columns=['MEDTIP', 'MEDPET', 'MEDFF', 'MEDEST'])
-print(dfmodel.info())
+    df = pd.merge(
+        clean_tformdet(dfformdet),
+        clean_producto(dfproducto),
+        how="left",
+        left_on="CODIGO_MED",
+        right_on="MEDCOD",
+    )
+    df = df.drop(columns=["MEDCOD"]).dropna()
 
-# write my model in csv
-# df.to_csv(DIR_PATH / 'data' / 'df.csv', index=False)
+    dfmodel = df.rename(columns={"TOTAL_CONSUMO": "y"})
+    return pd.get_dummies(dfmodel, columns=categorical_columns)
 
-# numerical_df = df.select_dtypes(include=[np.number])
-# print(numerical_df.corr())
 
+def main():
+    dfmodel = build_model_frame(*load_sources())
+    dfmodel.info()
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.analytics.bulk import build_product_status, gather_products, stream_products
+from src.analytics.forecast import build_forecast
+
+
+@pytest.fixture
+def indexes(tformdet_row):
+    rows = [tformdet_row("00001", m, 10, 40, "L1") for m in range(202401, 202407)]
+    rows += [tformdet_row("00001", 202406, 0, 60, "L2")]
+    # 00002 dejó de informarse en 202403: su stock ya no es vigente.
+    rows += [tformdet_row("00002", m, 5, 80, "L9") for m in range(202401, 202404)]
+    tformdet = pd.DataFrame(rows)
+    mstockalm = pd.DataFrame({"ALMCOD": ["A1"], "MEDCOD": ["00003"], "STKSALDO": [7]})
+    mproducto = pd.DataFrame(
+        {"MEDCOD": ["00001", "00002", "00003"], "MEDTIP": "M", "MEDEST": "E"}
+    )
+    return build_product_status(tformdet, mstockalm), build_forecast(
+        tformdet, mproducto
+    )
+
+
+def _bulk(indexes, codes, batch_size, real_time=False):
+    status, forecast = indexes
+    result = gather_products(status, forecast, codes, real_time=real_time)
+    return json.loads(b"".join(stream_products(result, batch_size)))
+
+
+def test_stock_fin_is_the_latest_snapshot(indexes):
+    response = _bulk(indexes, ["00001", "00002", "00003", "99999"], batch_size=10)
+
+    records = {record["CODIGO_MED"]: record for record in response["data"]}
+    assert response["count"] == 4 and response["found"] == 3
+    assert records["00001"]["STOCK_FIN"] == 100
+    assert records["00002"]["STOCK_FIN"] == 0
+    assert records["99999"] == {
+        "CODIGO_MED": "99999",
+        "FOUND": False,
+        "CPMA": None,
+        "STOCK_FIN": None,
+        "NIVELES": None,
+        "SITUACION": None,
+        "PRONOSTICO": None,
+    }
+    real_time = _bulk(indexes, ["00003"], batch_size=10, real_time=True)
+    assert real_time["data"][0]["STOCK_FIN"] == 7
+
+
+def test_batches_do_not_change_the_response(indexes):
+    codes = ["00003", "99999", "00001", "00002", "00001"]
+
+    assert _bulk(indexes, codes, batch_size=2) == _bulk(indexes, codes, batch_size=10)
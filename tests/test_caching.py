@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src import caching
+
+COMPARISON = "/api/data/comparison?period=202103-202108&real_time=false"
+
+
+def test_matching_etag_is_not_modified(client):
+    response = client.get(COMPARISON)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # El orden de los parámetros no cambia el ETag.
+    reordered = client.get("/api/data/comparison?real_time=false&period=202103-202108")
+    assert reordered.headers["ETag"] == etag
+
+    for header in (etag, f"W/{etag}", f'"otro", {etag}'):
+        cached = client.get(COMPARISON, headers={"If-None-Match": header})
+        assert cached.status_code == 304
+        assert cached.content == b""
+        assert cached.headers["ETag"] == etag
+
+    other = client.get(COMPARISON, headers={"If-None-Match": '"otro"'})
+    assert other.status_code == 200
+
+
+def test_if_modified_since(client):
+    last_modified = client.get(COMPARISON).headers["Last-Modified"]
+
+    cached = client.get(COMPARISON, headers={"If-Modified-Since": last_modified})
+    assert cached.status_code == 304
+
+    stale = client.get(
+        COMPARISON, headers={"If-Modified-Since": "Mon, 01 Jan 1990 00:00:00 GMT"}
+    )
+    assert stale.status_code == 200
+
+
+class Tomorrow(date):
+    @classmethod
+    def today(cls):
+        return date.today() + timedelta(days=1)
+
+
+@pytest.mark.parametrize("query", ["", "?days=30", "?days=30&as_of="])
+def test_expiry_etag_follows_the_default_as_of(client, monkeypatch, query):
+    today = date.today().strftime("%d-%m-%Y")
+    response = client.get(f"/api/data/expiry{query}")
+    assert response.status_code == 200, response.text
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+
+    # Sin as_of la respuesta es la de hoy: mismo ETag que con la fecha explícita.
+    separator = "&" if query else "?"
+    explicit = client.get(f"/api/data/expiry{query}{separator}as_of={today}")
+    assert explicit.headers["ETag"] == etag
+
+    monkeypatch.setattr(caching, "date", Tomorrow)
+    # Al día siguiente el as_of efectivo cambia: ni el ETag ni la fecha valen.
+    for headers in ({"If-None-Match": etag}, {"If-Modified-Since": last_modified}):
+        assert (
+            client.get(f"/api/data/expiry{query}", headers=headers).status_code == 200
+        )
+
+    # Con as_of explícito la respuesta no depende del día.
+    pinned = client.get(
+        f"/api/data/expiry{query}{separator}as_of={today}",
+        headers={"If-None-Match": etag},
+    )
+    assert pinned.status_code == 304
@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+METRICS = ("CPMA", "CONSUMO_MEN", "STOCK_FIN", "NIVELES", "SITUACION")
+
+
+@pytest.mark.parametrize("real_time", [False, True])
+def test_comparison_period_matches_summary(client, real_time):
+    params = {"start_date": 202103, "end_date": 202108, "real_time": real_time}
+    summary = client.get("/api/data/summary", params=params)
+    comparison = client.get(
+        "/api/data/comparison",
+        params={"period": "202103-202108", "real_time": real_time},
+    )
+    assert summary.status_code == 200, summary.text
+    assert comparison.status_code == 200, comparison.text
+
+    expected = {
+        row["CODIGO_MED"]: {name: row[name] for name in METRICS}
+        for row in summary.json()["data"]
+    }
+    actual = {
+        row["CODIGO_MED"]: {name: row["periods"][0][name] for name in METRICS}
+        for row in comparison.json()["data"]
+    }
+    assert actual.keys() == expected.keys()
+    for code, metrics in expected.items():
+        assert actual[code]["SITUACION"] == metrics["SITUACION"], code
+        assert actual[code]["CONSUMO_MEN"] == metrics["CONSUMO_MEN"], code
+        for name in ("CPMA", "STOCK_FIN", "NIVELES"):
+            assert actual[code][name] == pytest.approx(metrics[name]), (code, name)
+
+    period = comparison.json()["periods"][0]
+    assert period["anomes"] == summary.json()["anomes"] == 6
+    assert period["count"] == summary.json()["count"]
+
+
+def test_comparison_without_data_reports_period_counts(client):
+    response = client.get(
+        "/api/data/comparison", params=[("period", "199001-199002")] * 2
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == []
+    for period in response.json()["periods"]:
+        assert period == {
+            "start_date": 199001,
+            "end_date": 199002,
+            "anomes": 0,
+            "count": 0,
+        }
+
+
+def test_month_total_row_is_not_counted_as_stock(tformdet_row):
+    from src.analytics.bulk import build_product_status
+    from src.analytics.summary import (
+        build_summary,
+        prepare_consumption,
+        prepare_monthly_consumption,
+    )
+
+    tformdet = pd.DataFrame(
+        [
+            tformdet_row("00001", 202212, venta=0, stock=40, lote="L1"),
+            tformdet_row("00001", 202212, venta=0, stock=60, lote="L2"),
+            # Fila sin lote con el total del mes: trae el consumo, no más stock.
+            tformdet_row("00001", 202212, venta=20, stock=100, lote=None),
+            # Sin filas por lote, la fila sin MEDLOTE es el stock del producto.
+            tformdet_row("00002", 202212, venta=5, stock=30, lote=None),
+        ]
+    )
+
+    monthly = prepare_monthly_consumption(tformdet).set_index("CODIGO_MED")
+    assert monthly["STOCK_FIN"].to_dict() == {"00001": 100, "00002": 30}
+    assert monthly["TOTAL_CONSUMO"].to_dict() == {"00001": 20, "00002": 5}
+
+    summary = build_summary(
+        prepare_consumption(tformdet),
+        pd.DataFrame(columns=["ALMCOD", "MEDCOD", "STKSALDO"]),
+        pd.DataFrame({"MEDCOD": ["00001", "00002"], "MEDTIP": "M"}),
+        202212,
+        202212,
+    )
+    stock = {row["CODIGO_MED"]: row["STOCK_FIN"] for row in summary["data"]}
+    assert stock == {"00001": 100, "00002": 30}
+
+    status = build_product_status(
+        tformdet, pd.DataFrame(columns=["ALMCOD", "MEDCOD", "STKSALDO"])
+    )
+    assert status.stock_fin.tolist() == [100, 30]
@@ -0,0 +1,63 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from src.analytics.expiry import (
+    DAYS_PER_MONTH,
+    build_expiry_index,
+    build_expiry_risk,
+)
+
+
+@pytest.fixture
+def tformdet(tformdet_row):
+    def row(code, annomes, venta, stock, fec_exp, lote):
+        return tformdet_row(code, annomes, venta, stock, lote, fec_exp, precio=2.0)
+
+    rows = [row("00001", m, 30, 500, "2030-01-01", "L0") for m in range(202401, 202406)]
+    rows += [
+        # Foto actual (202406): dos lotes del producto 00001.
+        row("00001", 202406, 30, 20, "2024-07-16", "L1"),
+        row("00001", 202406, 0, 100, "2024-10-01", "L2"),
+        # 00002 dejó de informarse en 202403: su stock no es vigente.
+        row("00002", 202403, 10, 50, "2024-07-20", "L9"),
+    ]
+    return pd.DataFrame(rows)
+
+
+def test_expiry_uses_latest_snapshot_and_projects_fefo(tformdet):
+    index = build_expiry_index(tformdet)
+    mproducto = pd.DataFrame({"MEDCOD": ["00001", "00002"], "MEDTIP": "M"})
+
+    result = build_expiry_risk(index, mproducto, date(2024, 7, 10), 120)
+
+    assert result["snapshot"] == "202406"
+    lots = {lot["MEDLOTE"]: lot for lot in result["data"]}
+    assert set(lots) == {"L1", "L2"}
+
+    # CPMA 30 desde el 1/7 (fin de la foto): L1 vence a los 15 días con 20 de stock;
+    # L2 recibe el consumo desde que vence L1 hasta el 1/10 (día 92).
+    cpma = 30.0
+    consumed_l1 = cpma * 15 / DAYS_PER_MONTH
+    consumed_l2 = cpma * (92 - 15) / DAYS_PER_MONTH
+    assert lots["L1"]["CONSUMO_ESTIMADO"] == pytest.approx(consumed_l1)
+    assert lots["L1"]["STOCK_EN_RIESGO"] == pytest.approx(20 - consumed_l1)
+    assert lots["L2"]["STOCK_PREVIO"] == 20
+    assert lots["L2"]["STOCK_EN_RIESGO"] == pytest.approx(100 - consumed_l2)
+    assert lots["L2"]["VALOR_EN_RIESGO"] == pytest.approx(2 * (100 - consumed_l2))
+    assert lots["L1"]["DIAS_PARA_VENCER"] == 6
+    assert lots["L2"]["DIAS_PARA_VENCER"] == 83
+
+
+def test_expiry_stock_fully_consumed_is_not_at_risk(tformdet):
+    tformdet.loc[tformdet["MEDLOTE"] == "L1", "STOCK_FIN"] = 10
+    index = build_expiry_index(tformdet)
+
+    result = build_expiry_risk(
+        index, pd.DataFrame({"MEDCOD": ["00001"]}), date(2024, 7, 1), 30
+    )
+
+    assert [lot["MEDLOTE"] for lot in result["data"]] == ["L1"]
+    assert result["data"][0]["RIESGO"] is False
+    assert result["data"][0]["STOCK_EN_RIESGO"] == 0
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics.forecast import build_forecast, exponential_smoothing, reconcile
+
+
+def test_reconcile_matches_the_direct_wls_solution():
+    rng = np.random.default_rng(0)
+    membership = np.array(
+        [[1, 1, 1, 1, 1], [1, 1, 0, 0, 0], [0, 0, 1, 1, 1], [1, 0, 1, 0, 1]],
+        dtype=float,
+    )
+    bottom = rng.uniform(0, 50, (5, 3))
+    aggregates = rng.uniform(0, 150, (4, 3))
+
+    summing = np.vstack([membership, np.eye(5)])
+    weights = np.diag(1 / np.r_[membership.sum(axis=1), np.ones(5)])
+    expected = np.linalg.solve(
+        summing.T @ weights @ summing,
+        summing.T @ weights @ np.vstack([aggregates, bottom]),
+    )
+
+    np.testing.assert_allclose(reconcile(bottom, aggregates, membership), expected)
+    # Si los pronósticos base ya son coherentes, la conciliación no los cambia.
+    np.testing.assert_allclose(
+        reconcile(bottom, membership @ bottom, membership), bottom
+    )
+
+
+def test_reconciled_aggregates_are_the_sum_of_their_products(tformdet_row):
+    rng = np.random.default_rng(1)
+    codes = [f"{i:05d}" for i in range(1, 9)]
+    tformdet = pd.DataFrame(
+        [
+            # Consumos enteros: el suavizado trabaja igual en float.
+            tformdet_row(code, annomes, venta=int(rng.integers(0, 40)), stock=10)
+            for code in codes
+            for annomes in (202401, 202402, 202403, 202404, 202405, 202406)
+        ]
+    )
+    mproducto = pd.DataFrame(
+        {
+            "MEDCOD": codes[:-1],
+            "MEDTIP": ["M", "M", "I", "I", "M", "I", "M"],
+            "MEDEST": ["E1", "E2", "E1", "E2", "E1", "E2", "E1"],
+        }
+    )
+
+    forecast = build_forecast(tformdet, mproducto)
+    products = forecast.level("product")
+
+    assert products.index.tolist() == codes
+    assert (products.to_numpy() >= 0).all()
+    np.testing.assert_allclose(forecast.level("total").iloc[0], products.sum())
+    for level, column in (("medtip", "MEDTIP"), ("medest", "MEDEST")):
+        groups = (
+            mproducto.set_index("MEDCOD")[column].reindex(codes).fillna("Desconocido")
+        )
+        expected = products.groupby(groups.to_numpy()).sum()
+        actual = forecast.level(level)
+        assert sorted(actual.index) == sorted(expected.index)
+        np.testing.assert_allclose(actual.loc[expected.index], expected)
+
+
+def test_exponential_smoothing_of_a_constant_series():
+    history = np.array([[5, 5, 5, 5], [0, 0, 0, 0]])
+
+    assert exponential_smoothing(history) == pytest.approx([5.0, 0.0])
@@ -0,0 +1,136 @@
+import pandas as pd
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from benchmarks.synthetic import write_dbf
+from src.data import ingest
+from src.data.ingest import IngestionProgress, ingest_file
+from src.data.validation import Validator
+from src.database import dbf_ingestion, metadata, tformdet
+
+pytest.importorskip("aiosqlite")
+
+
+def tformdet_frame(months: list[int]) -> pd.DataFrame:
+    rows = [
+        {
+            "CODIGO_EJE": "040",
+            "CODIGO_PRE": "00012",
+            "TIPSUM": "D",
+            "ANNOMES": annomes,
+            "CODIGO_MED": f"{code:05d}",
+            "PRECIO": 1.5,
+            "INGRE": 10,
+            "VENTA": 4,
+            "SIS": 2,
+            "INTERSAN": 1,
+            "STOCK_FIN": 20,
+            "FEC_EXP": "2026-12-31",
+            "MEDLOTE": f"L{code}",
+            "MEDREGSAN": "",
+        }
+        for annomes in months
+        for code in range(1, 6)
+    ]
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+async def engine(tmp_path, monkeypatch):
+    # SQLite en lugar de Postgres: sin COPY, ingest_file usa INSERT.
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'ingest.db'}")
+    async with engine.begin() as connection:
+        await connection.run_sync(metadata.create_all, tables=[dbf_ingestion, tformdet])
+    monkeypatch.setattr(ingest, "engine", engine)
+    yield engine
+    await engine.dispose()
+
+
+async def count(engine, table) -> int:
+    async with engine.connect() as connection:
+        return (
+            await connection.execute(select(func.count()).select_from(table))
+        ).scalar()
+
+
+async def run(path, tmp_path) -> tuple[int | None, IngestionProgress]:
+    progress = IngestionProgress()
+    validator = Validator("tformdet", tmp_path / "quarantine")
+    rows = await ingest_file("tformdet", path, progress, validator=validator)
+    validator.finish()
+    return rows, progress
+
+
+@pytest.mark.anyio
+async def test_rerun_with_same_checksum_is_skipped(engine, tmp_path):
+    path = tmp_path / "TFORMDET.DBF"
+    write_dbf(tformdet_frame([202401, 202402]), path)
+
+    rows, progress = await run(path, tmp_path)
+    assert rows == 10 and progress.rows == 10
+    assert await count(engine, tformdet) == 10
+
+    rows, progress = await run(path, tmp_path)
+    assert rows is None and progress.rows == 0
+    assert await count(engine, tformdet) == 10
+    assert await count(engine, dbf_ingestion) == 1
+
+
+@pytest.mark.anyio
+async def test_changed_file_replaces_its_rows(engine, tmp_path):
+    path = tmp_path / "TFORMDET.DBF"
+    write_dbf(tformdet_frame([202401, 202402]), path)
+    await run(path, tmp_path)
+
+    write_dbf(tformdet_frame([202403]), path)
+    rows, _ = await run(path, tmp_path)
+    assert rows == 5
+    assert await count(engine, tformdet) == 5
+    assert await count(engine, dbf_ingestion) == 1
+
+
+@pytest.mark.anyio
+async def test_skipped_file_keys_count_for_the_next_files(engine, tmp_path):
+    first, second = tmp_path / "A.DBF", tmp_path / "B.DBF"
+    loaded = tformdet_frame([202401])
+    write_dbf(loaded, first)
+    write_dbf(pd.concat([loaded.head(1), tformdet_frame([202402])]), second)
+
+    async def run_both():
+        validator = Validator("tformdet", tmp_path / "quarantine")
+        for path in (first, second):
+            await ingest_file(
+                "tformdet",
+                path,
+                IngestionProgress(),
+                validator=validator,
+                seed_on_skip=True,
+            )
+        return validator.finish()
+
+    assert (await run_both()).rejected == 1
+    # Solo cambia el segundo: el duplicado del primero se sigue detectando.
+    write_dbf(pd.concat([loaded.head(1), tformdet_frame([202403])]), second)
+    assert (await run_both()).rejected == 1
+    assert await count(engine, tformdet) == 10
+
+
+@pytest.mark.anyio
+async def test_failed_load_writes_no_quarantine(engine, tmp_path, monkeypatch):
+    path = tmp_path / "TFORMDET.DBF"
+    frame = tformdet_frame([202401])
+    write_dbf(pd.concat([frame, frame.head(1)]), path)
+
+    async def fail(*args):
+        raise RuntimeError("conexión perdida")
+
+    monkeypatch.setattr(ingest, "_write_batch", fail)
+    validator = Validator("tformdet", tmp_path / "quarantine")
+    with pytest.raises(RuntimeError):
+        await ingest_file("tformdet", path, IngestionProgress(), validator=validator)
+    report = validator.finish()
+
+    assert (report.rows, report.rejected) == (0, 0)
+    assert not (tmp_path / "quarantine" / "tformdet.csv").exists()
+    assert await count(engine, tformdet) == 0
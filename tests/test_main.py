@@ -0,0 +1,47 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+
+from src.analytics import datasets, pool, warmup
+from src.main import app
+
+
+def test_failed_startup_task_is_reported_by_readiness(monkeypatch):
+    state = warmup.WarmupState()
+    monkeypatch.setattr(warmup, "state", state)
+
+    def warm_up():
+        state.ready = True
+        return state
+
+    def prestart():
+        raise RuntimeError("no arrancó el pool")
+
+    monkeypatch.setattr(warmup, "warm_up", warm_up)
+    monkeypatch.setattr(pool, "prestart", prestart)
+
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 5
+        while not state.failures and time.monotonic() < deadline:
+            time.sleep(0.01)
+        response = client.get("/readiness")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "failed"
+    assert response.json()["failures"] == {"pool": "no arrancó el pool"}
+
+
+def test_index_lock_does_not_block_the_event_loop(client):
+    # Mientras otro hilo tiene el lock (p. ej. el warm-up), /healthcheck responde.
+    with datasets._index_lock:
+        with ThreadPoolExecutor(1) as executor:
+            summary = executor.submit(
+                client.get, "/api/data/summary?start_date=202103&end_date=202108"
+            )
+            time.sleep(0.2)
+            started = time.monotonic()
+            assert client.get("/healthcheck").status_code == 200
+            assert time.monotonic() - started < 1
+            assert not summary.done()
+    assert summary.result().status_code == 200
@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+from src.profiling import ProfileStore, ProfilingMiddleware
+
+
+def busy_a() -> None:
+    end = time.perf_counter() + 0.02
+    while time.perf_counter() < end:
+        pass
+
+
+def busy_b() -> None:
+    end = time.perf_counter() + 0.02
+    while time.perf_counter() < end:
+        pass
+
+
+async def endpoint_a(request):
+    for _ in range(10):
+        busy_a()
+        await asyncio.sleep(0)
+    return PlainTextResponse("a")
+
+
+async def endpoint_b(request):
+    for _ in range(10):
+        busy_b()
+        await asyncio.sleep(0)
+    return PlainTextResponse("b")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(tmp_path, max_profiles=10)
+
+
+async def endpoint_fast(request):
+    return PlainTextResponse("fast")
+
+
+def make_client(store, **options):
+    routes = [
+        Route("/a", endpoint_a),
+        Route("/b", endpoint_b),
+        Route("/fast", endpoint_fast),
+    ]
+    app = ProfilingMiddleware(
+        Starlette(routes=routes), store=store, interval=0.001, **options
+    )
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"
+    )
+
+
+@pytest.fixture
+def client(store):
+    return make_client(store)
+
+
+@pytest.mark.anyio
+async def test_concurrent_profiles_do_not_mix(client, store):
+    async with client:
+        await asyncio.gather(
+            client.get("/a", headers={"X-Profile": "1"}),
+            client.get("/b", params={"profile": "1"}),
+        )
+
+    profiles = {meta["path"]: meta for meta in store.list()}
+    assert set(profiles) == {"/a", "/b"}
+    folded_a = store.get_folded(profiles["/a"]["id"])
+    folded_b = store.get_folded(profiles["/b"]["id"])
+    assert "busy_a" in folded_a and "busy_b" not in folded_a
+    assert "busy_b" in folded_b and "busy_a" not in folded_b
+
+
+@pytest.mark.anyio
+async def test_without_threshold_only_requested_profiles_are_kept(client, store):
+    async with client:
+        await client.get("/a")
+        await client.get("/b", headers={"X-Profile": "0"})
+
+    assert store.list() == []
+
+
+@pytest.mark.anyio
+async def test_requests_over_the_threshold_are_kept(store):
+    async with make_client(store, threshold=0.1) as client:
+        await client.get("/a")  # ~200 ms
+        await client.get("/fast")
+
+    profiles = store.list()
+    assert [(meta["path"], meta["trigger"]) for meta in profiles] == [("/a", "slow")]
+    assert profiles[0]["duration_ms"] >= 100
+    assert "busy_a" in store.get_folded(profiles[0]["id"])
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("sample_rate,kept", [(1.0, 1), (0.0, 0)])
+async def test_sampled_requests_are_kept(store, sample_rate, kept):
+    async with make_client(store, threshold=10, sample_rate=sample_rate) as client:
+        await client.get("/a")
+
+    profiles = store.list()
+    assert len(profiles) == kept
+    assert all(meta["trigger"] == "sampled" for meta in profiles)
+
+
+@pytest.mark.anyio
+async def test_requested_profile_is_kept_below_the_threshold(store):
+    async with make_client(store, threshold=10) as client:
+        await client.get("/a", headers={"X-Profile": "1"})
+
+    assert [meta["trigger"] for meta in store.list()] == ["requested"]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from src.analytics.simulation import Scenario
+from src.analytics.summary import situacion, situacion_array
+
+
+@pytest.mark.parametrize(
+    "thresholds",
+    [{"sobrestock": 2, "substock": 3}, {"substock": -1}, {"substock": 8}],
+)
+def test_invalid_thresholds_are_rejected(client, thresholds):
+    with pytest.raises(ValueError, match="Umbrales inválidos"):
+        Scenario(**thresholds)
+
+    simulation = client.post("/api/data/simulation", json={"scenarios": [thresholds]})
+    assert simulation.status_code == 400
+    assert "Umbrales inválidos" in simulation.text
+
+    summary = client.get(
+        "/api/data/summary",
+        params={"start_date": 202103, "end_date": 202108, **thresholds},
+    )
+    # substock < 0 lo rechaza la validación de FastAPI (ge=0).
+    assert summary.status_code in (400, 422)
+    if summary.status_code == 400:
+        assert "Umbrales inválidos" in summary.text
+
+
+def test_reorder_months_must_be_positive():
+    with pytest.raises(ValueError, match="reorder_months"):
+        Scenario(reorder_months=0)
+
+
+def test_scalar_and_vector_situacion_agree():
+    cases = [(8, 1, 8), (0.5, 1, 0.5), (0, 0, 5), (0, 0, 0), (3, 1, 3)]
+    niveles, cpma, stock_fin = (np.array(values, float) for values in zip(*cases))
+
+    vector = situacion_array(niveles, cpma, stock_fin, 5, 2)
+
+    assert [situacion(*case, 5, 2) for case in cases] == vector.tolist()
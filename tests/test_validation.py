@@ -0,0 +1,107 @@
+import pandas as pd
+
+from src.data.validation import (
+    REVIEW,
+    Validator,
+    analysis_frame,
+    validation_order,
+)
+
+
+def tformdet_rows(*lotes: str) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "CODIGO_EJE": "040",
+                "CODIGO_PRE": "00012",
+                "TIPSUM": "D",
+                "ANNOMES": "202401",
+                "CODIGO_MED": "00946",
+                "PRECIO": "1.5",
+                "INGRE": "10",
+                "VENTA": "4",
+                "SIS": "0",
+                "INTERSAN": "0",
+                "STOCK_FIN": "20",
+                "FEC_EXP": "2026-12-31",
+                "MEDLOTE": lote,
+                "MEDREGSAN": "",
+            }
+            for lote in lotes
+        ]
+    )
+
+
+def test_codes_keep_leading_zeros(tmp_path):
+    valid = Validator("tformdet", tmp_path).validate(tformdet_rows("L1"))
+    assert valid.loc[0, "CODIGO_MED"] == "00946"
+    assert valid.loc[0, "CODIGO_EJE"] == "040"
+
+    frame = analysis_frame(tformdet_rows("L1"), "tformdet")
+    assert frame.loc[0, "CODIGO_MED"] == "00946"
+    assert frame["STOCK_FIN"].dtype == "int64"
+    assert frame["VENTA"].dtype == "float64"
+
+
+def test_duplicate_without_lot_is_kept_and_flagged(tmp_path):
+    validator = Validator("tformdet", tmp_path)
+    valid = validator.validate(tformdet_rows("L1", "L1", "", ""))
+    validator.commit()
+    report = validator.finish()
+
+    # El duplicado con lote se descarta; el que no tiene lote se conserva.
+    assert len(valid) == 3
+    assert (report.valid, report.rejected, report.flagged) == (3, 1, 1)
+    quarantine = pd.read_csv(tmp_path / "tformdet.csv", dtype=str)
+    assert sorted(quarantine["_MOTIVO"]) == [
+        "clave_duplicada",
+        f"{REVIEW}:MEDLOTE",
+    ]
+
+
+def test_quarantine_is_written_on_commit_only(tmp_path):
+    validator = Validator("tformdet", tmp_path)
+    validator.validate(tformdet_rows("L1", "L1"))
+    assert not (tmp_path / "tformdet.csv").exists()
+
+    # El archivo no se guardó: su cuarentena, conteos y claves se descartan.
+    validator.rollback()
+    assert validator.report.rows == 0
+    assert len(validator.validate(tformdet_rows("L1"))) == 1
+    validator.commit()
+    report = validator.finish()
+
+    assert (report.rows, report.rejected) == (1, 0)
+    assert not (tmp_path / "tformdet.csv").exists()
+
+
+def test_uncommitted_file_does_not_count(tmp_path):
+    validator = Validator("tformdet", tmp_path)
+    validator.validate(tformdet_rows("L1"))
+    validator.commit()
+    validator.validate(tformdet_rows("L1", "L2"))
+    report = validator.finish()
+
+    assert (report.rows, report.valid, report.rejected) == (1, 1, 0)
+
+
+def test_newest_product_record_wins(tmp_path):
+    paths = [tmp_path / "2022", tmp_path / "2023"]
+    assert validation_order("mproducto", paths) == paths[::-1]
+    assert validation_order("tformdet", paths) == paths
+
+    columns = ["MEDNOM", "MEDPRES", "MEDCNC", "MEDTIP", "MEDPET", "MEDFF"]
+    mproducto = pd.DataFrame(
+        {
+            "MEDCOD": ["00946", "00946", "00946", "00010"],
+            "MEDEST": ["ANTIGUA", "NUEVA", "SIN FECHA", "UNICA"],
+            "PRDFECHULT": ["2020-12-28", "2022-06-01", None, None],
+            "MEDREGSAN": "",
+            "ESTADO": "A",
+            **{col: "x" for col in columns},
+        }
+    )
+    frame = analysis_frame(mproducto, "mproducto").set_index("MEDCOD")
+
+    assert frame.loc["00946", "MEDEST"] == "NUEVA"
+    assert frame.loc["00010", "MEDEST"] == "UNICA"
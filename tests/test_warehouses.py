@@ -0,0 +1,38 @@
+import pandas as pd
+
+from src.analytics.bulk import build_product_status
+from src.analytics.summary import merge_stock
+from src.analytics.warehouses import prepare_warehouse_stock
+
+
+def test_only_the_latest_snapshot_of_a_warehouse_counts(tformdet_row):
+    mstockalm = pd.DataFrame(
+        {
+            "ALMCOD": ["A1", "A1", "A2", "A1"],
+            "MEDCOD": ["00143", "00143", "00143", "00200"],
+            # Dos exportaciones anuales del mismo (A1, 00143): vale la última.
+            "STKSALDO": [771, 1419, 5, 3],
+            "STKFECHULT": [
+                "2024-12-31 10:00:00",
+                "2021-12-31 10:00:00",
+                "2021-06-30 10:00:00",
+                None,
+            ],
+        }
+    )
+
+    stock = prepare_warehouse_stock(mstockalm)
+    assert stock.values.tolist() == [
+        ["A1", "00143", 771],
+        ["A1", "00200", 3],
+        ["A2", "00143", 5],
+    ]
+
+    pivot = merge_stock(
+        pd.DataFrame({"CODIGO_MED": ["00143"]}), pd.DataFrame(), mstockalm, True
+    )
+    assert pivot["STOCK_FIN"].tolist() == [776]
+
+    tformdet = pd.DataFrame([tformdet_row("00143", 202412, venta=10, stock=1)])
+    status = build_product_status(tformdet, mstockalm)
+    assert dict(zip(status.codes, status.stock_real)) == {"00143": 776, "00200": 3}